@@ -0,0 +1,105 @@
+"""Thousands of concurrent awaiting requests against AsyncWelcomeHomeApp.
+
+Fires N read requests at once (find_item_locations, find_order_items and
+a page of list_items) from one session of an AsyncWelcomeHomeBackend, and
+reports throughput and the peak number of threads. For comparison the
+same load goes through asyncio.to_thread on the blocking WelcomeHomeApp,
+which opens a fresh connection for every call.
+
+Usage: python benchmarks/bench_async.py [requests]
+"""
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+from welcomehome.asyncapp import AsyncWelcomeHomeBackend
+from welcomehome.passwords import PasswordHasher
+
+FAST_HASHER = PasswordHasher(params={'i': 1000})
+
+
+def populate(db_path):
+    app = WelcomeHomeApp(db_path, password_hasher=FAST_HASHER)
+    app.register_user('staff1', 'password', 'staff')
+    app.login('staff1', 'password')
+    with app._connect() as conn:
+        conn.execute("INSERT INTO donors VALUES ('donor1', 'Donor', '')")
+    app.accept_donation('donor1', [{'name': f"item {n}", 'location': f"shelf-{n % 20}"}
+                                   for n in range(5000)])
+    order_ids = []
+    item_ids = [row[0] for row in app.list_items(limit=5000)]
+    for n in range(200):
+        order_ids.append(app.start_order('staff1'))
+        for item_id in item_ids[n * 5:(n + 1) * 5]:
+            app.add_to_order(item_id)
+    return item_ids, order_ids
+
+
+def workload(n, item_ids, order_ids):
+    rng = random.Random(n)
+    return [(kind, rng.choice(item_ids if kind == 'locations' else order_ids))
+            for kind in (rng.choice(['locations', 'order_items', 'page']) for _ in range(n))]
+
+
+async def sample_threads(peak, stop):
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.001)
+
+
+async def run_async(db_path, requests):
+    backend = await AsyncWelcomeHomeBackend.open(db_path, password_hasher=FAST_HASHER)
+    app = backend.session()
+    await app.login('staff1', 'password')
+    calls = {'locations': app.find_item_locations, 'order_items': app.find_order_items,
+             'page': lambda _: app.list_items(limit=50)}
+    return backend, [calls[kind](arg) for kind, arg in requests]
+
+
+async def run_to_thread(db_path, requests):
+    app = WelcomeHomeApp(db_path, password_hasher=FAST_HASHER)
+    app.login('staff1', 'password')
+    calls = {'locations': app.find_item_locations, 'order_items': app.find_order_items,
+             'page': lambda _: app.list_items(limit=50)}
+    return app, [asyncio.to_thread(calls[kind], arg) for kind, arg in requests]
+
+
+async def measure(label, setup, db_path, requests):
+    with contextlib.redirect_stdout(io.StringIO()):
+        app, coroutines = await setup(db_path, requests)
+    peak, stop = [threading.active_count()], asyncio.Event()
+    sampler = asyncio.create_task(sample_threads(peak, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*coroutines)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+    if isinstance(app, AsyncWelcomeHomeBackend):
+        await app.close()
+    print(f"{label:<22}{len(requests) / elapsed:>12.0f}{peak[0]:>14}")
+
+
+async def main():
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'async.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            item_ids, order_ids = populate(db_path)
+        requests = workload(n_requests, item_ids, order_ids)
+
+        print(f"{n_requests} concurrent requests")
+        print(f"{'mode':<22}{'req/s':>12}{'peak threads':>14}")
+        await measure('AsyncWelcomeHomeApp', run_async, db_path, requests)
+        await measure('asyncio.to_thread', run_to_thread, db_path, requests)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
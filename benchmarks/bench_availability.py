@@ -0,0 +1,98 @@
+"""Benchmark browsing available items: SQL query vs AvailabilityIndex.
+
+Fills a database with items spread over categories and locations (most
+of them available), then times browse by category, by location and by
+both, once through SQLite (indexed on status) and once through the
+in-memory index. Also reports the cost of rebuilding the index.
+
+Usage: python benchmarks/bench_availability.py [items]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+from welcomehome.availability import AvailabilityIndex
+
+CATEGORIES = 50
+LOCATIONS = [f"shelf-{n}" for n in range(40)]
+
+SQL_BROWSE = {
+    'category': ('''SELECT item_id, name, category_id, location FROM items
+                    WHERE status = 'available' AND category_id = ?'''),
+    'location': ('''SELECT item_id, name, category_id, location FROM items
+                    WHERE status = 'available' AND location = ?'''),
+    'both': ('''SELECT item_id, name, category_id, location FROM items
+                WHERE status = 'available' AND category_id = ? AND location = ?'''),
+}
+
+
+def populate(path, n_items):
+    WelcomeHomeApp(path)
+    rng = random.Random(1)
+    with sqlite3.connect(path) as conn:
+        conn.executemany('''
+            INSERT INTO items (item_id, category_id, name, status, location)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(str(uuid.uuid4()), rng.randrange(CATEGORIES), f"item {n}",
+               'available' if rng.random() < 0.8 else 'ordered', rng.choice(LOCATIONS))
+              for n in range(n_items)])
+        conn.commit()
+
+
+def best_of(fn, queries, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            fn(*query)
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries)
+
+
+def main():
+    n_items = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rng = random.Random(2)
+    queries = {
+        'category': [(rng.randrange(CATEGORIES),) for _ in range(50)],
+        'location': [(rng.choice(LOCATIONS),) for _ in range(50)],
+        'both': [(rng.randrange(CATEGORIES), rng.choice(LOCATIONS)) for _ in range(50)],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'availability.db')
+        populate(path, n_items)
+
+        index = AvailabilityIndex()
+        start = time.perf_counter()
+        index.rebuild(path)
+        rebuild = time.perf_counter() - start
+
+        conn = sqlite3.connect(path)
+        index_browse = {
+            'category': lambda c: index.browse(category_id=c),
+            'location': lambda l: index.browse(location=l),
+            'both': lambda c, l: index.browse(c, l),
+        }
+
+        print(f"{n_items} items, index rebuild {rebuild * 1000:.0f} ms, "
+              f"{len(index.items)} available")
+        print(f"{'browse by':<12}{'sql ms':>10}{'index ms':>10}{'speedup':>10}")
+        for name, sql in SQL_BROWSE.items():
+            sql_time = best_of(lambda *args: conn.execute(sql, args).fetchall(), queries[name])
+            index_time = best_of(index_browse[name], queries[name])
+            print(f"{name:<12}{sql_time * 1000:>10.3f}{index_time * 1000:>10.3f}"
+                  f"{sql_time / index_time:>10.1f}")
+        conn.close()
+
+        report = index.check_consistency(path)
+        print("consistency:", 'ok' if not any(report.values()) else report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Delivery planning time with a large backlog of ready orders.
+
+Fills a database with ready_for_delivery orders (1-8 items each, spread
+over regions and ages), then times DeliveryDispatcher.plan for a handful
+of runs and for the whole backlog, and the dispatch write itself.
+
+Usage: python benchmarks/bench_dispatch.py [orders]
+"""
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+
+REGIONS = ['north', 'south', 'east', 'west', 'central', None]
+
+
+def populate(path, n_orders):
+    with contextlib.redirect_stdout(io.StringIO()):
+        WelcomeHomeApp(path)
+    rng = random.Random(1)
+    with sqlite3.connect(path) as conn:
+        item_pk = 0
+        for order_pk in range(1, n_orders + 1):
+            conn.execute('''
+                INSERT INTO orders (order_pk, order_id, client_username, status, created_at, delivery_region)
+                VALUES (?, ?, 'client1', 'ready_for_delivery', datetime('now', ?), ?)
+            ''', (order_pk, str(uuid.uuid4()), f"-{rng.randrange(72 * 60)} minutes", rng.choice(REGIONS)))
+            for _ in range(rng.randint(1, 8)):
+                item_pk += 1
+                conn.execute('''
+                    INSERT INTO items (item_pk, item_id, name, status, location)
+                    VALUES (?, ?, 'item', 'ready', 'delivery_holding')
+                ''', (item_pk, str(uuid.uuid4())))
+                conn.execute('INSERT INTO order_items (order_pk, item_pk) VALUES (?, ?)',
+                             (order_pk, item_pk))
+        conn.commit()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    n_orders = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dispatch.db')
+        populate(path, n_orders)
+        with contextlib.redirect_stdout(io.StringIO()):
+            app = WelcomeHomeApp(path)
+        dispatcher = app.dispatcher
+
+        with sqlite3.connect(path) as conn:
+            cursor = conn.cursor()
+            _, query_ms = timed(lambda: dispatcher._pending_orders(cursor))
+            few, few_ms = timed(lambda: dispatcher.plan(cursor, max_runs=20))
+            everything, all_ms = timed(lambda: dispatcher.plan(cursor))
+            dispatched, dispatch_ms = timed(lambda: dispatcher.dispatch(cursor, None, 20))
+            conn.commit()
+
+        print(f"{n_orders} ready orders")
+        print(f"pending-order query        {query_ms:8.1f} ms")
+        print(f"plan 20 runs               {few_ms:8.1f} ms  ({sum(len(r['order_ids']) for r in few)} orders)")
+        print(f"plan whole backlog         {all_ms:8.1f} ms  ({len(everything)} runs)")
+        print(f"dispatch 20 runs (write)   {dispatch_ms:8.1f} ms  ({len(dispatched)} runs)")
+
+
+if __name__ == '__main__':
+    main()
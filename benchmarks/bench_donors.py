@@ -0,0 +1,133 @@
+"""Benchmark donor deduplication with the blocking index.
+
+Generates donors with distinct names from a pool of first names and
+random syllable surnames, then adds perturbed copies of some of them
+(typos, swapped name order, honorifics, reformatted phone numbers). Times building the index and finding
+duplicates, compares the number of scored pairs with all n*(n-1)/2
+pairs, reports precision and recall against the planted duplicates, and
+times search-as-you-type queries.
+
+Usage: python benchmarks/bench_donors.py [donors] [duplicate_fraction]
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+from welcomehome.donors import DonorIndex
+
+FIRST = ['james', 'mary', 'robert', 'patricia', 'john', 'jennifer', 'michael', 'linda',
+         'david', 'elizabeth', 'william', 'barbara', 'richard', 'susan', 'joseph', 'jessica',
+         'thomas', 'sarah', 'charles', 'karen', 'maria', 'jose', 'wei', 'fatima', 'ahmed',
+         'olga', 'yuki', 'priya', 'chen', 'ana']
+ONSETS = ['b', 'br', 'c', 'ch', 'd', 'f', 'g', 'gr', 'h', 'j', 'k', 'l', 'm', 'n', 'p',
+          'r', 's', 'sh', 'st', 't', 'v', 'w', 'y', 'z']
+VOWELS = ['a', 'e', 'i', 'o', 'u', 'ai', 'ou']
+CODAS = ['', '', 'n', 'r', 'l', 's', 'k', 'm', 'tt', 'nd']
+
+
+def surname(rng):
+    return ''.join(rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS)
+                   for _ in range(rng.randint(2, 3)))
+
+
+def phone(rng):
+    return f"{rng.randint(200, 999)}{rng.randint(200, 999)}{rng.randint(1000, 9999)}"
+
+
+def typo(rng, word):
+    i = rng.randrange(1, len(word))
+    return word[:i] + word[i + 1:] if rng.random() < 0.5 else word[:i] + rng.choice('aeiou') + word[i:]
+
+
+def perturb(rng, first, last, contact):
+    """A plausible re-entry of the same donor at intake"""
+    choice = rng.random()
+    if choice < 0.3:
+        name = f"{typo(rng, first).title()} {last.title()}"
+    elif choice < 0.5:
+        name = f"{last.title()}, {first.title()}"
+    elif choice < 0.7:
+        name = f"Dr. {first.title()} {typo(rng, last).title()}"
+    else:
+        name = f"{first.upper()} {last.upper()}"
+    if contact and rng.random() < 0.5:
+        contact = f"({contact[:3]}) {contact[3:6]}-{contact[6:]}"
+    elif rng.random() < 0.3:
+        contact = None
+    return name, contact
+
+
+def populate(path, n_donors, duplicate_fraction):
+    WelcomeHomeApp(path)
+    rng = random.Random(1)
+    rows, planted, names = [], set(), set()
+    while len(names) < n_donors:
+        first, last = rng.choice(FIRST), surname(rng)
+        if (first, last) in names:
+            continue
+        names.add((first, last))
+        contact = phone(rng) if rng.random() < 0.8 else None
+        donor_id = str(uuid.uuid4())
+        rows.append((donor_id, f"{first.title()} {last.title()}", contact))
+        if rng.random() < duplicate_fraction:
+            copy_id = str(uuid.uuid4())
+            rows.append((copy_id, *perturb(rng, first, last, contact)))
+            planted.add(tuple(sorted((donor_id, copy_id))))
+    with sqlite3.connect(path) as conn:
+        conn.executemany('INSERT INTO donors (donor_id, name, contact_info) VALUES (?, ?, ?)', rows)
+        conn.commit()
+    return rows, planted
+
+
+def main():
+    n_donors = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    duplicate_fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        rows, planted = populate(path, n_donors, duplicate_fraction)
+        print(f"{len(rows)} donors, {len(planted)} planted duplicates")
+
+        index = DonorIndex()
+        start = time.perf_counter()
+        index.rebuild(path)
+        print(f"index build: {time.perf_counter() - start:.2f}s "
+              f"({len(index.blocks)} blocks, {len(index.grams)} trigrams)")
+
+        scored = sum(len(members) * (len(members) - 1) // 2
+                     for members in index.blocks.values()
+                     if 2 <= len(members) <= index.max_block_size)
+        all_pairs = len(rows) * (len(rows) - 1) // 2
+        print(f"candidate pairs: {scored} of {all_pairs} ({scored / all_pairs:.6%})")
+
+        start = time.perf_counter()
+        found = {(a, b) for _, a, b in index.duplicates()}
+        print(f"find duplicates: {time.perf_counter() - start:.2f}s, {len(found)} pairs")
+
+        true_positives = len(found & planted)
+        print(f"precision: {true_positives / max(len(found), 1):.3f}  "
+              f"recall: {true_positives / max(len(planted), 1):.3f}")
+
+        rng = random.Random(3)
+        latencies = []
+        for _ in range(200):
+            name = rng.choice(rows)[1]
+            for length in range(2, len(name) + 1):
+                start = time.perf_counter()
+                index.search(name[:length])
+                latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"search-as-you-type: {len(latencies)} keystrokes, "
+              f"p50 {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Write throughput with 1-32 concurrent sessions, with and without group commit.
+
+Each client thread is its own logged-in WelcomeHomeApp session calling
+start_order() in a loop. In 'direct' mode every call commits on its own
+connection; in 'group' mode all sessions share one GroupCommitWriter.
+Both runs use WAL mode with SQLite's default (FULL) synchronous setting.
+
+Usage: python benchmarks/bench_group_commit.py [writes_per_client]
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+from welcomehome.passwords import PasswordHasher
+from welcomehome.writer import GroupCommitWriter
+
+# Cheap hashing so session setup does not dominate the run
+FAST_HASHER = PasswordHasher(params={'i': 1000})
+
+
+def run(db_path, clients, writes, writer):
+    """Return writes per second for `clients` concurrent sessions"""
+    failed = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        sessions = []
+        for n in range(clients):
+            app = WelcomeHomeApp(db_path, password_hasher=FAST_HASHER, writer=writer)
+            # One client key per session, so the shared login rate limiter
+            # does not throttle the sessions of a large run
+            if not app.login('staff1', 'password', f"bench-{n}"):
+                raise RuntimeError(f"session {n} could not log in")
+            sessions.append(app)
+
+        barrier = threading.Barrier(clients + 1)
+
+        def worker(app):
+            barrier.wait()
+            for _ in range(writes):
+                if app.start_order('client1') is None:
+                    failed.append(1)
+
+        threads = [threading.Thread(target=worker, args=(app,)) for app in sessions]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    if failed:
+        raise RuntimeError(f"{len(failed)} start_order calls failed")
+    return clients * writes / elapsed
+
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'writes.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            app = WelcomeHomeApp(db_path, password_hasher=FAST_HASHER)
+            app.register_user('staff1', 'password', 'staff')
+            app.register_user('client1', 'password', 'client')
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+
+        print(f"{writes} start_order calls per client")
+        print(f"{'clients':>8}{'direct w/s':>14}{'group w/s':>14}{'avg batch':>12}")
+        for clients in (1, 2, 4, 8, 16, 32):
+            direct = run(db_path, clients, writes, None)
+            writer = GroupCommitWriter(db_path)
+            group = run(db_path, clients, writes, writer)
+            writer.close()
+            print(f"{clients:>8}{direct:>14.0f}{group:>14.0f}"
+                  f"{writer.stats()['average_batch']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
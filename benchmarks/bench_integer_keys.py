@@ -0,0 +1,167 @@
+"""Benchmark UUID text primary keys against integer surrogate keys.
+
+Builds the same data set twice: once with the legacy schema (36-character
+UUID primary keys everywhere) and once through WelcomeHomeApp (integer
+rowid keys with the UUID kept as an indexed external identifier), then
+compares database size, find_order_items and an order join.
+
+Usage: python benchmarks/bench_integer_keys.py [orders] [items_per_order]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+
+LEGACY_SCHEMA = '''
+CREATE TABLE items (
+    item_id TEXT PRIMARY KEY, category_id INTEGER, name TEXT,
+    description TEXT, status TEXT DEFAULT 'available', location TEXT);
+CREATE TABLE orders (
+    order_id TEXT PRIMARY KEY, client_username TEXT,
+    status TEXT DEFAULT 'in_progress',
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE order_items (
+    order_id TEXT, item_id TEXT, PRIMARY KEY(order_id, item_id));
+'''
+
+LEGACY_FIND_ORDER_ITEMS = '''
+    SELECT i.item_id, i.location
+    FROM items i
+    JOIN order_items oi ON i.item_id = oi.item_id
+    WHERE oi.order_id = ?
+'''
+
+LEGACY_ORDER_JOIN = '''
+    SELECT o.order_id, COUNT(*)
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.order_id
+    JOIN items i ON i.item_id = oi.item_id
+    WHERE i.status = 'ordered'
+    GROUP BY o.order_id
+'''
+
+ORDER_JOIN = '''
+    SELECT o.order_id, COUNT(*)
+    FROM orders o
+    JOIN order_items oi ON oi.order_pk = o.order_pk
+    JOIN items i ON i.item_pk = oi.item_pk
+    WHERE i.status = 'ordered'
+    GROUP BY o.order_pk
+'''
+
+
+def generate(n_orders, items_per_order):
+    """Generate (order_id, [item_id, ...]) pairs"""
+    return [(str(uuid.uuid4()), [str(uuid.uuid4()) for _ in range(items_per_order)])
+            for _ in range(n_orders)]
+
+
+def build_legacy(path, data):
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+        for order_id, item_ids in data:
+            conn.execute('INSERT INTO orders (order_id, client_username) VALUES (?, ?)',
+                         (order_id, 'client1'))
+            conn.executemany(
+                "INSERT INTO items (item_id, name, status, location) VALUES (?, 'item', 'ordered', 'shelf')",
+                [(item_id,) for item_id in item_ids])
+            conn.executemany('INSERT INTO order_items (order_id, item_id) VALUES (?, ?)',
+                             [(order_id, item_id) for item_id in item_ids])
+        conn.commit()
+    with sqlite3.connect(path) as conn:
+        conn.execute('VACUUM')
+
+
+def build_integer(path, data):
+    WelcomeHomeApp(path)
+    with sqlite3.connect(path) as conn:
+        for order_id, item_ids in data:
+            order_pk = conn.execute(
+                'INSERT INTO orders (order_id, client_username) VALUES (?, ?)',
+                (order_id, 'client1')).lastrowid
+            item_pks = [conn.execute(
+                "INSERT INTO items (item_id, name, status, location) VALUES (?, 'item', 'ordered', 'shelf')",
+                (item_id,)).lastrowid for item_id in item_ids]
+            conn.executemany('INSERT INTO order_items (order_pk, item_pk) VALUES (?, ?)',
+                             [(order_pk, item_pk) for item_pk in item_pks])
+        conn.commit()
+    with sqlite3.connect(path) as conn:
+        conn.execute('VACUUM')
+
+
+FIND_ORDER_ITEMS = '''
+    SELECT i.item_id, i.location
+    FROM orders o
+    JOIN order_items oi ON oi.order_pk = o.order_pk
+    JOIN items i ON i.item_pk = oi.item_pk
+    WHERE o.order_id = ?
+'''
+
+
+def query_runner(conn, sql):
+    """Run a find_order_items query on an open connection, so the numbers
+    measure the lookup rather than connection setup"""
+    return lambda order_id: conn.execute(sql, (order_id,)).fetchall()
+
+
+def time_lookups(run, order_ids, repeat=3):
+    """Best-of-repeat time for looking up every order once"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for order_id in order_ids:
+            run(order_id)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_query(path, sql, repeat=3):
+    best = float('inf')
+    with sqlite3.connect(path) as conn:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(sql).fetchall()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n_orders = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    items_per_order = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    data = generate(n_orders, items_per_order)
+    sample = [order_id for order_id, _ in data[::max(1, n_orders // 20000)]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        integer_path = os.path.join(tmp, 'integer.db')
+        build_legacy(legacy_path, data)
+        build_integer(integer_path, data)
+
+        legacy_conn = sqlite3.connect(legacy_path)
+        integer_conn = sqlite3.connect(integer_path)
+
+        results = {
+            'db size (KiB)': (os.path.getsize(legacy_path) / 1024,
+                              os.path.getsize(integer_path) / 1024),
+            'find_order_items x%d (ms)' % len(sample): (
+                1000 * time_lookups(query_runner(legacy_conn, LEGACY_FIND_ORDER_ITEMS), sample),
+                1000 * time_lookups(query_runner(integer_conn, FIND_ORDER_ITEMS), sample)),
+            'order join (ms)': (1000 * time_query(legacy_path, LEGACY_ORDER_JOIN),
+                                1000 * time_query(integer_path, ORDER_JOIN)),
+        }
+        legacy_conn.close()
+        integer_conn.close()
+
+    print(f"{n_orders} orders x {items_per_order} items")
+    print(f"{'metric':<32}{'uuid keys':>12}{'int keys':>12}{'ratio':>8}")
+    for name, (legacy, integer) in results.items():
+        print(f"{name:<32}{legacy:>12.1f}{integer:>12.1f}{legacy / integer:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Flood login with bad passwords, with and without rate limiting.
+
+Several threads hammer login() for one real account from a few clients.
+Without limiting every attempt pays a full password hash; with the
+LoginRateLimiter buckets empty quickly and later attempts are rejected
+before hashing, so CPU time stays flat as the flood grows.
+
+Usage: python benchmarks/bench_login_flood.py [attempts] [threads]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+from welcomehome.ratelimit import LoginRateLimiter
+
+
+def flood(app, attempts, threads):
+    """Run bad logins across threads; return (wall s, cpu s)"""
+    per_thread = attempts // threads
+
+    def worker(n):
+        for i in range(per_thread):
+            app.login('staff1', 'wrong-password', client=f"kiosk-{n % 4}")
+
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+    return time.perf_counter() - start_wall, time.process_time() - start_cpu
+
+
+def main():
+    attempts = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = WelcomeHomeApp(os.path.join(tmp, 'flood.db'))
+        app.register_user('staff1', 'correct-password', 'staff')
+
+        print(f"{attempts} bad logins from {threads} threads")
+        print(f"{'limiter':<10}{'wall s':>10}{'cpu s':>10}{'hashed':>10}{'blocked':>10}")
+        for label, limiter in [
+                ('off', LoginRateLimiter(app.db_path, user_capacity=1e9, client_capacity=1e9)),
+                ('on', LoginRateLimiter(app.db_path))]:
+            app.login_limiter = limiter
+            wall, cpu = flood(app, attempts, threads)
+            limiter.flush()
+            stats = limiter.stats()
+            hashed = stats.get('attempts', 0) - stats.get('blocked', 0)
+            print(f"{label:<10}{wall:>10.2f}{cpu:>10.2f}{hashed:>10}{stats.get('blocked', 0):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark matching new donations against open client needs.
+
+Fills databases of growing inventory size with items described from a
+small vocabulary, adds open needs (keywords, optionally a category), and
+then times matching a batch of newly donated items two ways: through the
+NeedMatcher's inverted indexes, and by re-running every open need as a
+SQL query over the available inventory. The indexed cost should stay
+flat as the inventory grows; the rescan grows with it.
+
+Usage: python benchmarks/bench_matching.py [needs] [batch]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+from welcomehome.matching import NeedMatcher, keywords
+
+INVENTORY_SIZES = [5000, 20000, 100000]
+NOUNS = ['coat', 'jacket', 'chair', 'table', 'lamp', 'shoe', 'boot', 'blanket', 'pillow',
+         'stroller', 'crib', 'desk', 'sofa', 'dresser', 'mug', 'plate', 'pan', 'kettle',
+         'heater', 'fan', 'scarf', 'glove', 'hat', 'backpack', 'bike', 'helmet', 'radio', 'book']
+ADJECTIVES = ['winter', 'kids', 'wool', 'oak', 'small', 'large', 'blue', 'red', 'leather',
+              'folding', 'electric', 'cotton', 'steel', 'warm', 'used', 'new', 'soft', 'tall']
+CATEGORIES = 20
+
+
+def describe(rng):
+    return ' '.join(rng.sample(ADJECTIVES, 2) + [rng.choice(NOUNS)])
+
+
+def populate(path, n_items, n_needs):
+    app = WelcomeHomeApp(path)
+    rng = random.Random(1)
+    with sqlite3.connect(path) as conn:
+        category_ids = [app.categories.add_category(conn.cursor(), f"category {n}")
+                        for n in range(CATEGORIES)]
+        conn.executemany('''
+            INSERT INTO items (item_id, category_id, name, description, location)
+            VALUES (?, ?, ?, ?, 'shelf')
+        ''', [(str(uuid.uuid4()), rng.choice(category_ids), rng.choice(NOUNS), describe(rng))
+              for _ in range(n_items)])
+        needs = []
+        for _ in range(n_needs):
+            words = keywords(rng.choice(ADJECTIVES), rng.choice(NOUNS))
+            category_id = rng.choice(category_ids) if rng.random() < 0.3 else None
+            needs.append((str(uuid.uuid4()), 'client', category_id, ' '.join(sorted(words))))
+        conn.executemany('''
+            INSERT INTO client_needs (need_id, client_username, category_id, keywords)
+            VALUES (?, ?, ?, ?)
+        ''', needs)
+        conn.commit()
+        app.categories.load(conn.cursor())
+    return app, category_ids
+
+
+def rescan(conn, new_item_ids):
+    """Re-run every open need against the inventory, keeping new items"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT need_pk, category_id, keywords FROM client_needs WHERE status = 'open'")
+    matches = {}
+    for need_pk, category_id, words in cursor.fetchall():
+        conditions = ' AND '.join("(' ' || lower(name || ' ' || description) || ' ') LIKE ?"
+                                  for _ in words.split())
+        params = [f'% {word}%' for word in words.split()]
+        if category_id is not None:
+            conditions += ' AND category_id = ?'
+            params.append(category_id)
+        cursor.execute(f"SELECT item_id FROM items WHERE status = 'available' AND {conditions}",
+                       params)
+        hits = [row[0] for row in cursor.fetchall() if row[0] in new_item_ids]
+        if hits:
+            matches[need_pk] = hits
+    return matches
+
+
+def main():
+    n_needs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print(f"{n_needs} open needs, batches of {batch} new items")
+    print(f"{'inventory':>10} {'build':>8} {'indexed/batch':>14} {'rescan/batch':>13} {'matches':>8}")
+    for n_items in INVENTORY_SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            app, category_ids = populate(path, n_items, n_needs)
+            rng = random.Random(2)
+
+            matcher = NeedMatcher(app.categories)
+            start = time.perf_counter()
+            matcher.rebuild(path)
+            build = time.perf_counter() - start
+
+            new_items = [(str(uuid.uuid4()), rng.choice(category_ids), rng.choice(NOUNS), describe(rng))
+                         for _ in range(batch)]
+            with sqlite3.connect(path) as conn:
+                conn.executemany('''
+                    INSERT INTO items (item_id, category_id, name, description, location)
+                    VALUES (?, ?, ?, ?, 'shelf')
+                ''', new_items)
+                conn.commit()
+
+                start = time.perf_counter()
+                for item_id, category_id, name, description in new_items:
+                    matcher.add_item(item_id, category_id, name, description)
+                indexed_matches = matcher.needs_for_items(item[0] for item in new_items)
+                indexed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                scanned_matches = rescan(conn, {item[0] for item in new_items})
+                scanned = time.perf_counter() - start
+
+            agree = ({k: sorted(v) for k, v in indexed_matches.items()}
+                     == {k: sorted(v) for k, v in scanned_matches.items()})
+            print(f"{n_items:>10} {build:>7.2f}s {indexed * 1000:>11.2f} ms {scanned * 1000:>10.1f} ms "
+                  f"{sum(map(len, indexed_matches.values())):>8}{'' if agree else '  (MISMATCH)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark memory and time for large listings by row type.
+
+Fills an items table with a million rows and reads the whole listing as
+plain tuples, dicts, sqlite3.Row objects and slotted records, then as
+records projected to two columns, and finally streamed through
+iter_records without keeping rows. Memory is measured with tracemalloc:
+retained bytes per row for the materialized listings, peak bytes for
+the stream. Column values (the strings themselves) are the same in
+every variant, so differences come from the row containers and from
+what projection and streaming avoid holding.
+
+Usage: python benchmarks/bench_records.py [rows] [chunk_size]
+"""
+import gc
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+from welcomehome.records import ItemRecord, iter_records, record_type
+
+LISTING = 'SELECT item_id, name, category_id, location, status FROM items ORDER BY item_pk'
+PROJECTED = 'SELECT item_id, status FROM items ORDER BY item_pk'
+
+
+def populate(path, n_rows):
+    WelcomeHomeApp(path)
+    with sqlite3.connect(path) as conn:
+        conn.executemany('''
+            INSERT INTO items (item_id, category_id, name, description, location)
+            VALUES (?, ?, ?, '', ?)
+        ''', ((str(uuid.uuid4()), n % 50, f"item {n}", f"shelf {n % 200}") for n in range(n_rows)))
+        conn.commit()
+
+
+def dict_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def materialize(path, sql, row_factory):
+    with sqlite3.connect(path) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory
+        cursor.execute(sql)
+        return cursor.fetchall()
+
+
+def stream(path, chunk_size):
+    count = 0
+    with sqlite3.connect(path) as conn:
+        for _ in iter_records(conn.cursor(), LISTING, record=ItemRecord, chunk_size=chunk_size):
+            count += 1
+    return count
+
+
+def measure(fn, *args):
+    """(result, seconds, retained bytes, peak bytes) of one call"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        populate(path, n_rows)
+        print(f"{n_rows} rows of (item_id, name, category_id, location, status)")
+        print(f"{'row type':<22} {'time':>7} {'bytes/row':>10} {'container':>10} {'peak MB':>8}")
+
+        projected = record_type('ItemRecord', ('item_id', 'status'))
+        variants = [
+            ('tuple', LISTING, None),
+            ('dict', LISTING, dict_factory),
+            ('sqlite3.Row', LISTING, sqlite3.Row),
+            ('record', LISTING, ItemRecord.from_row),
+            ('record, 2 columns', PROJECTED, projected.from_row),
+        ]
+        for label, sql, row_factory in variants:
+            rows, elapsed, retained, peak = measure(materialize, path, sql, row_factory)
+            # A Row wraps the tuple it was built from
+            container = sys.getsizeof(rows[0]) + (sys.getsizeof(tuple(rows[0]))
+                                                  if isinstance(rows[0], sqlite3.Row) else 0)
+            print(f"{label:<22} {elapsed:>6.2f}s {retained / n_rows:>10.0f} {container:>10} "
+                  f"{peak / 2 ** 20:>8.0f}")
+            del rows
+
+        count, elapsed, retained, peak = measure(stream, path, chunk_size)
+        print(f"{f'stream, chunks of {chunk_size}':<22} {elapsed:>6.2f}s {'-':>10} {'-':>10} "
+              f"{peak / 2 ** 20:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Measure GUI startup: time until the login window is painted.
+
+Launches the GUI in a fresh interpreter for each run, in two modes:
+
+  lazy   the shipped behaviour: paint the login window, then import and
+         construct WelcomeHomeApp (database connection and schema DDL)
+  eager  the previous behaviour: construct WelcomeHomeApp before the
+         window is built
+
+Times are wall-clock from process launch, so interpreter startup and
+imports are included. Needs a display (use xvfb-run on a headless box).
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import sys, time
+mode, db_path = sys.argv[1], sys.argv[2]
+import tkinter as tk
+from welcomehome.gui import WelcomeHomeGUI
+
+marks = {}
+
+class TimedGUI(WelcomeHomeGUI):
+    def _load_backend_after_paint(self):
+        self.master.wait_visibility()
+        self.master.update_idletasks()
+        marks['painted'] = time.time()
+        self.app
+        marks['backend'] = time.time()
+        self.master.quit()
+
+root = tk.Tk()
+if mode == 'eager':
+    from welcomehome.app import WelcomeHomeApp
+    backend = WelcomeHomeApp(db_path)
+gui = TimedGUI(root, db_path)
+if mode == 'eager':
+    gui._app = backend
+root.mainloop()
+print(marks['painted'], marks['backend'])
+'''
+
+
+def launch(mode, db_path):
+    """Return (seconds to painted login window, seconds to backend ready)"""
+    start = time.time()
+    out = subprocess.run([sys.executable, '-c', CHILD, mode, db_path],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    painted, backend = (float(value) for value in out.split()[-2:])
+    return painted - start, backend - start
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'welcomehome.db')
+        shutil.copy(os.path.join(ROOT, 'welcomehome.db'), db_path)
+        try:
+            # Warm-up run also brings the copied database up to date
+            launch('eager', db_path)
+        except subprocess.CalledProcessError as e:
+            print("Could not start Tk (no display?):")
+            print(e.stderr.strip().splitlines()[-1])
+            return
+
+        print(f"{'mode':<8}{'login painted ms':>18}{'backend ready ms':>18}   (median of {runs})")
+        for mode in ('eager', 'lazy'):
+            samples = [launch(mode, db_path) for _ in range(runs)]
+            painted = statistics.median(s[0] for s in samples) * 1000
+            backend = statistics.median(s[1] for s in samples) * 1000
+            print(f"{mode:<8}{painted:>18.1f}{backend:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
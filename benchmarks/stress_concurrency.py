@@ -0,0 +1,277 @@
+"""Multi-process stress test of donations and orders, with kill injection.
+
+Spawns worker processes, each a logged-in staff session on one shared
+database, running a random mix of accept_donation, start_order followed
+by add_to_order on items the other workers are also trying to order,
+and prepare_order. While they run, the parent SIGKILLs a random worker
+every few seconds (often mid-transaction) and starts a replacement.
+Afterwards it checks the database:
+
+- PRAGMA integrity_check passes
+- no item is in two orders
+- no order_items row points at a missing order or item
+- item statuses agree with order membership and order status
+
+and reports throughput, latency and lock waits per operation. Lock wait
+is the time spent in write statements and commits, which is where a
+session blocks on another's lock; the statements themselves take
+microseconds on these tables. Each worker flushes its statistics every
+second, so a killed worker loses at most its last second. Exits with
+status 1 if an invariant is violated.
+
+Usage: python benchmarks/stress_concurrency.py [workers] [seconds] [kill_interval] [journal_mode]
+"""
+import contextlib
+import functools
+import io
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from welcomehome.app import WelcomeHomeApp
+from welcomehome.passwords import PasswordHasher
+
+# Cheap hashing so session setup does not dominate the run
+FAST_HASHER = PasswordHasher(params={'i': 1000})
+CLIENTS = ['client1', 'client2', 'client3', 'client4']
+NAMES = ['chair', 'table', 'lamp', 'coat', 'blanket', 'kettle', 'crib', 'desk']
+WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+# Workers order from the newest available items, so they collide often
+CONTENDED = 20
+
+# Seconds this process has spent blocked in writes and commits
+lock_wait = [0.0]
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        if not sql.lstrip().upper().startswith(WRITES):
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            lock_wait[0] += time.perf_counter() - start
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            lock_wait[0] += time.perf_counter() - start
+
+
+def setup(db_path, journal_mode, initial_items=200):
+    """Users, a donor and some available items; returns the donor ID"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = WelcomeHomeApp(db_path, password_hasher=FAST_HASHER)
+        app.register_user('staff1', 'password', 'staff')
+        for client in CLIENTS:
+            app.register_user(client, 'password', 'client')
+        app.login('staff1', 'password')
+        donor_id = app.register_donor('Stress Donor', force=True)
+        app.accept_donation(donor_id, [{'name': NAMES[n % len(NAMES)], 'location': 'shelf'}
+                                       for n in range(initial_items)])
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(f'PRAGMA journal_mode={journal_mode}')
+    return donor_id
+
+
+def worker(db_path, stats_path, donor_id, seed, deadline):
+    """Run random operations until the deadline, flushing stats to stats_path"""
+    sys.stdout = open(os.devnull, 'w')
+    rng = random.Random(seed)
+    app = WelcomeHomeApp(db_path, password_hasher=FAST_HASHER,
+                         connection_factory=functools.partial(sqlite3.connect, db_path,
+                                                              factory=TimedConnection))
+    app.login('staff1', 'password')
+    stats = defaultdict(lambda: {'count': 0, 'errors': 0, 'locked': 0, 'latency': [], 'lock_wait': 0.0})
+
+    def timed(name, method, *args):
+        entry = stats[name]
+        waited = lock_wait[0]
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        except sqlite3.OperationalError as e:
+            entry['locked' if 'locked' in str(e) else 'errors'] += 1
+        finally:
+            entry['count'] += 1
+            entry['latency'].append(time.perf_counter() - start)
+            entry['lock_wait'] += lock_wait[0] - waited
+
+    def flush():
+        temporary = stats_path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(stats, f)
+        os.replace(temporary, stats_path)
+
+    flushed = time.time()
+    while time.time() < deadline:
+        if rng.random() < 0.3:
+            timed('accept_donation', app.accept_donation, donor_id,
+                  [{'name': rng.choice(NAMES), 'location': 'shelf'} for _ in range(rng.randint(1, 3))])
+        else:
+            order_id = timed('start_order', app.start_order, rng.choice(CLIENTS))
+            if order_id:
+                with sqlite3.connect(db_path) as conn:
+                    candidates = [row[0] for row in conn.execute('''
+                        SELECT item_id FROM items WHERE status = 'available'
+                        ORDER BY item_pk DESC LIMIT ?
+                    ''', (CONTENDED,))]
+                for item_id in rng.sample(candidates, min(len(candidates), rng.randint(1, 4))):
+                    timed('add_to_order', app.add_to_order, item_id)
+                if rng.random() < 0.5:
+                    timed('prepare_order', app.prepare_order, order_id)
+        if time.time() - flushed > 1:
+            flush()
+            flushed = time.time()
+    flush()
+
+
+def check_invariants(db_path):
+    """Descriptions of every violated invariant (empty when consistent)"""
+    checks = {
+        'integrity check failed': '''
+            SELECT COUNT(*) FROM pragma_integrity_check WHERE integrity_check != 'ok'
+        ''',
+        'items in more than one order': '''
+            SELECT COUNT(*) FROM (
+                SELECT item_pk FROM order_items GROUP BY item_pk HAVING COUNT(*) > 1
+            )
+        ''',
+        'order_items without their order or item': '''
+            SELECT COUNT(*) FROM order_items oi
+            LEFT JOIN orders o ON o.order_pk = oi.order_pk
+            LEFT JOIN items i ON i.item_pk = oi.item_pk
+            WHERE o.order_pk IS NULL OR i.item_pk IS NULL
+        ''',
+        'available items inside an order': '''
+            SELECT COUNT(*) FROM items i
+            WHERE i.status = 'available'
+            AND EXISTS (SELECT 1 FROM order_items oi WHERE oi.item_pk = i.item_pk)
+        ''',
+        'ordered or ready items in no order': '''
+            SELECT COUNT(*) FROM items i
+            WHERE i.status IN ('ordered', 'ready')
+            AND NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.item_pk = i.item_pk)
+        ''',
+        'item status disagrees with its order status': '''
+            SELECT COUNT(*) FROM order_items oi
+            JOIN orders o ON o.order_pk = oi.order_pk
+            JOIN items i ON i.item_pk = oi.item_pk
+            WHERE (i.status = 'ready') != (o.status = 'ready_for_delivery')
+            OR (i.status = 'ready') != (i.location = 'delivery_holding')
+        ''',
+    }
+    violations = []
+    with sqlite3.connect(db_path) as conn:
+        for description, sql in checks.items():
+            count = conn.execute(sql).fetchone()[0]
+            if count:
+                violations.append(f"{description}: {count}")
+    return violations
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(stats_dir, elapsed):
+    totals = defaultdict(lambda: {'count': 0, 'errors': 0, 'locked': 0, 'latency': [], 'lock_wait': 0.0})
+    for name in os.listdir(stats_dir):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(stats_dir, name)) as f:
+            for operation, entry in json.load(f).items():
+                total = totals[operation]
+                for key in ('count', 'errors', 'locked', 'lock_wait'):
+                    total[key] += entry[key]
+                total['latency'].extend(entry['latency'])
+
+    print(f"{'operation':<16} {'ops':>7} {'ops/s':>7} {'p50 ms':>7} {'p99 ms':>8} {'max ms':>8} "
+          f"{'lock wait':>10} {'locked':>7} {'errors':>7}")
+    for operation, total in sorted(totals.items()):
+        latency = sorted(total['latency'])
+        if not latency:
+            continue
+        print(f"{operation:<16} {total['count']:>7} {total['count'] / elapsed:>7.0f} "
+              f"{statistics.median(latency) * 1000:>7.1f} {percentile(latency, 0.99) * 1000:>8.1f} "
+              f"{latency[-1] * 1000:>8.0f} {total['lock_wait'] / sum(latency):>10.0%} "
+              f"{total['locked']:>7} {total['errors']:>7}")
+    ops = sum(total['count'] for total in totals.values())
+    print(f"total: {ops} ops, {ops / elapsed:.0f} ops/s (lock wait as a share of latency; "
+          f"'locked' = busy timeouts)")
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    kill_interval = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    journal_mode = sys.argv[4] if len(sys.argv) > 4 else 'delete'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'stress.db')
+        donor_id = setup(db_path, journal_mode)
+        rng = random.Random(0)
+        seeds = iter(range(1, 1000000))
+        deadline = time.time() + seconds
+
+        def spawn():
+            seed = next(seeds)
+            process = multiprocessing.Process(
+                target=worker, args=(db_path, os.path.join(tmp, f"worker-{seed}.json"),
+                                     donor_id, seed, deadline))
+            process.start()
+            return process
+
+        print(f"{workers} workers for {seconds:.0f}s, killing one every ~{kill_interval}s, "
+              f"journal_mode={journal_mode}")
+        start = time.time()
+        processes = [spawn() for _ in range(workers)]
+        kills = 0
+        while True:
+            pause = rng.expovariate(1 / kill_interval) if kill_interval > 0 else seconds
+            if time.time() + pause >= deadline - 1:
+                break
+            time.sleep(pause)
+            victim = rng.randrange(workers)
+            processes[victim].kill()
+            processes[victim].join()
+            kills += 1
+            processes[victim] = spawn()
+        for process in processes:
+            process.join()
+        elapsed = time.time() - start
+
+        print(f"{kills} workers killed")
+        report(tmp, elapsed)
+        violations = check_invariants(db_path)
+        with sqlite3.connect(db_path) as conn:
+            counts = conn.execute('''
+                SELECT (SELECT COUNT(*) FROM items), (SELECT COUNT(*) FROM orders),
+                       (SELECT COUNT(*) FROM order_items)
+            ''').fetchone()
+        print("items: {}, orders: {}, order_items: {}".format(*counts))
+        if violations:
+            for violation in violations:
+                print(f"INVARIANT VIOLATED: {violation}")
+            sys.exit(1)
+        print("all invariants hold")
+
+
+if __name__ == '__main__':
+    main()
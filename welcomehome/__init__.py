@@ -0,0 +1,14 @@
+"""WelcomeHome inventory management.
+
+Kept import-light so the GUI can paint its login window before the backend
+and its database are loaded.
+"""
+
+__version__ = '0.1.0'
+
+
+def __getattr__(name):
+    if name == 'WelcomeHomeApp':
+        from .app import WelcomeHomeApp
+        return WelcomeHomeApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
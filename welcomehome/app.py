@@ -0,0 +1,1200 @@
+import copy
+import os
+import sqlite3
+import uuid
+from typing import Optional, List, Tuple, Union, Dict, Callable, BinaryIO, Iterator, Sequence, Type
+from .permissions import PermissionEngine, ANONYMOUS_ROLE, SELF_SERVICE_ROLE, requires_permission
+from .passwords import PasswordHasher
+from .ratelimit import LoginRateLimiter
+from .availability import AvailabilityIndex
+from .writer import GroupCommitWriter
+from .reporting import ReportingEngine
+from .dispatch import DeliveryDispatcher
+from .attachments import AttachmentStore
+from .shared import database_key, forget_state, shared_state
+from .records import (Record, OrderRecord, ItemRecord, UserOrderRecord, OrderItemRecord,
+                      record_type, iter_records, projection)
+from . import categories, donors, matching
+
+# Users whose role may give new accounts roles other than client
+ROLE_ASSIGNERS = '''
+    SELECT 1 FROM users u
+    JOIN role_permissions rp ON rp.role = u.role
+    WHERE rp.permission = 'assign_roles'
+    LIMIT 1
+'''
+
+# Tables given integer surrogate keys, with the key column that marks the
+# new layout; order_items is renamed first, as it refers to the others
+INTEGER_KEYED_TABLES = {'order_items': 'order_pk', 'items': 'item_pk',
+                        'orders': 'order_pk', 'donations': 'donation_pk'}
+
+class WelcomeHomeApp:
+    def __init__(self, db_path='welcomehome.db', password_hasher: Optional[PasswordHasher] = None,
+                 writer: Optional[GroupCommitWriter] = None,
+                 connection_factory: Optional[Callable[[], sqlite3.Connection]] = None):
+        """Initialize the application and set up database.
+
+        Sessions sharing one GroupCommitWriter have their writes coalesced
+        into group commits; without one, every write commits on its own.
+        `connection_factory` replaces opening a new connection per call,
+        e.g. with per-thread connections that are reused."""
+        self.db_path = db_path
+        self._database = database_key(db_path)
+        self.writer = writer
+        self.connection_factory = connection_factory
+        self.password_hasher = password_hasher or PasswordHasher()
+        self.current_user = None
+        self.current_order = None
+        self._create_database()
+        # Every session on this database in the process shares these, so
+        # changes made through one are seen by the others
+        self.permissions = shared_state(self._database, 'permissions',
+                                        lambda: PermissionEngine(db_path))
+        self.login_limiter = shared_state(self._database, 'login_limiter',
+                                          lambda: LoginRateLimiter(db_path))
+        self.categories = shared_state(self._database, 'categories', self._build_category_tree)
+        self.availability = shared_state(self._database, 'availability',
+                                         self._build_availability_index)
+        self._reports = None
+        self.dispatcher = DeliveryDispatcher(db_path)
+        self.attachments = AttachmentStore(db_path)
+        self._donors = None
+        self._matcher = None
+
+    def session(self) -> 'WelcomeHomeApp':
+        """A new, logged-out session on the same database, sharing this
+        one's connections, writer and in-memory state without setting
+        the schema up again; use one per client being served"""
+        session = copy.copy(self)
+        session.current_user = None
+        session.current_order = None
+        return session
+
+    def _build_category_tree(self) -> categories.CategoryTree:
+        tree = categories.CategoryTree()
+        with self._connect() as conn:
+            tree.load(conn.cursor())
+        return tree
+
+    def _build_availability_index(self) -> AvailabilityIndex:
+        index = AvailabilityIndex()
+        index.rebuild(self.db_path)
+        return index
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for one call; use as `with self._connect() as conn:`"""
+        if self.connection_factory is not None:
+            return self.connection_factory()
+        return sqlite3.connect(self.db_path)
+
+    def _create_database(self):
+        """Create database tables if they don't exist, migrating older
+        schemas first, all in one transaction"""
+        # With isolation_level=None the sqlite3 module leaves transactions
+        # to us instead of committing each DDL statement on its own, so an
+        # interrupted migration rolls back completely; IMMEDIATE also keeps
+        # two processes from migrating the same database at once
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+
+            # Categories became hierarchical after the table was first shipped
+            self._add_missing_column(cursor, 'categories', 'parent_id',
+                                     'INTEGER REFERENCES categories(category_id)')
+            # ...and names became unique among siblings instead of globally
+            if self._has_global_category_names(cursor):
+                self._rebuild_categories(cursor)
+
+            # Databases created before integer surrogate keys were introduced
+            # keep their UUID text primary keys until migrated
+            if self._needs_integer_key_migration(cursor):
+                self._migrate_integer_keys(cursor)
+
+            # Orders gained a delivery region for dispatch planning
+            self._add_missing_column(cursor, 'orders', 'delivery_region', 'TEXT')
+
+            self._create_tables(cursor)
+
+    def _table_columns(self, cursor, table: str) -> List[str]:
+        """Column names of a table; empty if it does not exist"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        return [row[1] for row in cursor.fetchall()]
+
+    def _add_missing_column(self, cursor, table: str, column: str, definition: str):
+        """Add a column to an existing table that predates it"""
+        columns = self._table_columns(cursor, table)
+        if columns and column not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+    def _has_global_category_names(self, cursor) -> bool:
+        """Check for the older categories table whose names were UNIQUE
+        on their own, across the whole hierarchy"""
+        cursor.execute("PRAGMA index_list('categories')")
+        for _, index, unique, _, partial in cursor.fetchall():
+            if unique and not partial:
+                cursor.execute(f"PRAGMA index_info('{index}')")
+                if [row[2] for row in cursor.fetchall()] == ['name']:
+                    return True
+        return False
+
+    def _rebuild_categories(self, cursor):
+        """Recreate categories with names unique per parent, keeping IDs"""
+        self._create_categories_table(cursor, 'categories_rebuilt')
+        cursor.execute('''
+            INSERT INTO categories_rebuilt (category_id, name, subcategory, parent_id)
+            SELECT category_id, name, subcategory, parent_id FROM categories
+        ''')
+        cursor.execute('DROP TABLE categories')
+        cursor.execute('ALTER TABLE categories_rebuilt RENAME TO categories')
+
+    def _create_categories_table(self, cursor, table: str = 'categories'):
+        """Categories table; parent_id forms the hierarchy, subcategory is
+        the older free-text field kept for existing data"""
+        # UNIQUE treats NULL parents as distinct, hence the extra index
+        # below for names at the top level
+        cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            category_id INTEGER PRIMARY KEY,
+            name TEXT,
+            subcategory TEXT,
+            parent_id INTEGER REFERENCES categories(category_id),
+            UNIQUE(parent_id, name)
+        )''')
+
+    def _create_tables(self, cursor):
+        """Create the core tables and their indexes"""
+        # Users table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            role TEXT NOT NULL
+        )''')
+
+        # Donors table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS donors (
+            donor_id TEXT PRIMARY KEY,
+            name TEXT,
+            contact_info TEXT
+        )''')
+
+        self._create_categories_table(cursor)
+
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_categories_parent
+        ON categories(parent_id)
+        ''')
+
+        cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_categories_top_level_name
+        ON categories(name) WHERE parent_id IS NULL
+        ''')
+
+        # Items table: item_pk is the internal rowid key, item_id the
+        # external UUID identifier
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS items (
+            item_pk INTEGER PRIMARY KEY,
+            item_id TEXT NOT NULL UNIQUE,
+            category_id INTEGER,
+            name TEXT,
+            description TEXT,
+            status TEXT DEFAULT 'available',
+            location TEXT,
+            FOREIGN KEY(category_id) REFERENCES categories(category_id)
+        )''')
+
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_items_status
+        ON items(status, category_id)
+        ''')
+
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_items_category
+        ON items(category_id)
+        ''')
+
+        # Orders table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            order_pk INTEGER PRIMARY KEY,
+            order_id TEXT NOT NULL UNIQUE,
+            client_username TEXT,
+            status TEXT DEFAULT 'in_progress',
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            delivery_region TEXT,
+            FOREIGN KEY(client_username) REFERENCES users(username)
+        )''')
+
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_orders_status
+        ON orders(status, created_at)
+        ''')
+
+        # Order Items table, keyed on the integer surrogates only
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_items (
+            order_pk INTEGER NOT NULL,
+            item_pk INTEGER NOT NULL,
+            PRIMARY KEY(order_pk, item_pk),
+            FOREIGN KEY(order_pk) REFERENCES orders(order_pk),
+            FOREIGN KEY(item_pk) REFERENCES items(item_pk)
+        ) WITHOUT ROWID''')
+
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_order_items_item
+        ON order_items(item_pk)
+        ''')
+
+        # Donations table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS donations (
+            donation_pk INTEGER PRIMARY KEY,
+            donation_id TEXT NOT NULL UNIQUE,
+            donor_id TEXT,
+            staff_username TEXT,
+            donation_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(donor_id) REFERENCES donors(donor_id),
+            FOREIGN KEY(staff_username) REFERENCES users(username)
+        )''')
+
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_donations_donor
+        ON donations(donor_id)
+        ''')
+
+        categories.create_tables(cursor)
+        donors.create_tables(cursor)
+        matching.create_tables(cursor)
+
+    def _needs_integer_key_migration(self, cursor) -> bool:
+        """Check whether the database still uses UUID text primary keys, or
+        holds *_legacy tables left by an interrupted migration"""
+        columns = self._table_columns(cursor, 'items')
+        return (bool(columns) and 'item_pk' not in columns) or bool(self._legacy_tables(cursor))
+
+    def _legacy_tables(self, cursor) -> List[str]:
+        """Tables renamed aside by the integer key migration"""
+        names = [f'{table}_legacy' for table in INTEGER_KEYED_TABLES]
+        cursor.execute(f'''
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name IN ({', '.join('?' * len(names))})
+        ''', names)
+        return [row[0] for row in cursor.fetchall()]
+
+    def _migrate_integer_keys(self, cursor):
+        """Rebuild items, orders, order_items and donations with integer keys.
+
+        Tables still in the old layout are renamed to *_legacy and copied
+        into new ones. Older versions ran this without a transaction and
+        could stop part way, so *_legacy tables already present are copied
+        too, merging with rows the new tables gained since."""
+        interrupted = bool(self._legacy_tables(cursor))
+        for table, key in INTEGER_KEYED_TABLES.items():
+            columns = self._table_columns(cursor, table)
+            if columns and key not in columns:
+                cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+        legacy = set(self._legacy_tables(cursor))
+
+        self._create_tables(cursor)
+
+        if 'items_legacy' in legacy:
+            cursor.execute('''
+                INSERT OR IGNORE INTO items (item_id, category_id, name, description, status, location)
+                SELECT item_id, category_id, name, description, status, location
+                FROM items_legacy
+            ''')
+        if 'orders_legacy' in legacy:
+            cursor.execute('''
+                INSERT OR IGNORE INTO orders (order_id, client_username, status, created_at)
+                SELECT order_id, client_username, status, created_at
+                FROM orders_legacy
+            ''')
+        if 'order_items_legacy' in legacy:
+            cursor.execute('''
+                INSERT OR IGNORE INTO order_items (order_pk, item_pk)
+                SELECT o.order_pk, i.item_pk
+                FROM order_items_legacy oi
+                JOIN orders o ON o.order_id = oi.order_id
+                JOIN items i ON i.item_id = oi.item_id
+            ''')
+        if 'donations_legacy' in legacy:
+            cursor.execute('''
+                INSERT OR IGNORE INTO donations (donation_id, donor_id, staff_username, donation_date)
+                SELECT donation_id, donor_id, staff_username, donation_date
+                FROM donations_legacy
+            ''')
+
+        for table in legacy:
+            cursor.execute(f'DROP TABLE {table}')
+        if interrupted:
+            print("Recovered an interrupted migration to integer surrogate keys.")
+        else:
+            print("Migrated database to integer surrogate keys.")
+
+    def _hash_password(self, password: str) -> Tuple[str, str]:
+        """Hash password with a fresh salt using the configured hasher"""
+        return self.password_hasher.hash(password)
+
+    def _write(self, operation, *args):
+        """Run operation(cursor, *args) in a write transaction and return its
+        result, through the group-commit writer when one is configured"""
+        if self.writer is not None:
+            return self.writer.submit(operation, *args).result()
+        with self._connect() as conn:
+            result = operation(conn.cursor(), *args)
+            conn.commit()
+            return result
+
+    @requires_permission('register_user')
+    def register_user(self, username: str, password: str, role: str):
+        """Register a new user; roles other than client need assign_roles"""
+        if role not in self.assignable_roles():
+            if role == ANONYMOUS_ROLE or role not in self.permissions.roles():
+                print(f"Unknown role: {role}.")
+            else:
+                print("Permission denied: assign_roles.")
+            return
+
+        hashed_password, salt = self._hash_password(password)
+        try:
+            added = self._write(self._insert_user, username, hashed_password, salt, role,
+                                self.has_permission('assign_roles'))
+        except sqlite3.IntegrityError:
+            print("Username already exists.")
+            return
+        if not added:
+            print("Permission denied: assign_roles.")
+            return
+        print(f"User {username} registered successfully.")
+
+    def _insert_user(self, cursor, username, hashed_password, salt, role, may_assign=False):
+        """Insert a user; False if the caller may not give them this role"""
+        # The role check is part of the INSERT so it runs under the write
+        # lock: two sign-ups can't both become the first staff account
+        cursor.execute(f'''
+            INSERT INTO users (username, password, salt, role)
+            SELECT ?, ?, ?, ?
+            WHERE ? = ? OR ? OR NOT EXISTS ({ROLE_ASSIGNERS})
+        ''', (username, hashed_password, salt, role, role, SELF_SERVICE_ROLE, may_assign))
+        return cursor.rowcount == 1
+
+    def assignable_roles(self) -> List[str]:
+        """Roles the current user may give a new account: client, or any
+        role for holders of assign_roles. Until some user holds it, any
+        role may be chosen, so the first staff account can be set up."""
+        if not self.has_permission('assign_roles'):
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(ROLE_ASSIGNERS)
+                if cursor.fetchone():
+                    return [SELF_SERVICE_ROLE]
+        return [role for role in self.permissions.roles() if role != ANONYMOUS_ROLE]
+
+    @requires_permission('login', default=False)
+    def login(self, username: str, password: str, client: str = 'local') -> bool:
+        """Login user and create session"""
+        # Throttle before any password hashing is done
+        if not self.login_limiter.allow(username, client):
+            print("Too many login attempts. Try again later.")
+            return False
+
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT password, salt, role FROM users WHERE username = ?', (username,))
+            result = cursor.fetchone()
+            
+            if result:
+                stored_password, salt, role = result
+                
+                if self.password_hasher.verify(password, stored_password, salt):
+                    # Upgrade hashes made with an older algorithm or cost
+                    if self.password_hasher.needs_rehash(stored_password):
+                        new_password, new_salt = self._hash_password(password)
+                        cursor.execute('''
+                            UPDATE users SET password = ?, salt = ?
+                            WHERE username = ?
+                        ''', (new_password, new_salt, username))
+                        conn.commit()
+
+                    self.current_user = {
+                        'username': username,
+                        'role': role
+                    }
+                    self.login_limiter.record_success(username, client)
+                    print(f"Welcome, {username}!")
+                    return True
+            
+            self.login_limiter.record_failure(username, client)
+            print("Invalid username or password.")
+            return False
+
+    def logout(self):
+        """End the session: forget the user and their open order"""
+        self.current_user = None
+        self.current_order = None
+
+    @requires_permission('find_item_locations', default=list)
+    def find_item_locations(self, item_id: str) -> List[str]:
+        """Find locations of all pieces of an item"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT location FROM items WHERE item_id = ?', (item_id,))
+            return [row[0] for row in cursor.fetchall()]
+
+    @requires_permission('find_order_items', default=list)
+    def find_order_items(self, order_id: str) -> List[OrderItemRecord]:
+        """Return list of items in an order with their locations"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = OrderItemRecord.from_row
+            cursor.execute('''
+                SELECT i.item_id, i.location
+                FROM orders o
+                JOIN order_items oi ON oi.order_pk = o.order_pk
+                JOIN items i ON i.item_pk = oi.item_pk
+                WHERE o.order_id = ?
+            ''', (order_id,))
+            return cursor.fetchall()
+
+    @requires_permission('accept_donation')
+    def accept_donation(self, donor_id: str, items: List[dict]):
+        """Accept donation from a donor"""
+        # Items may name their category by path, e.g. 'Furniture/Chairs'
+        for item in items:
+            if item.get('category') and item.get('category_id') is None:
+                category_id = self._category_id(item['category'])
+                if category_id is None:
+                    print(f"Unknown category: {item['category']}.")
+                    return
+                item['category_id'] = category_id
+
+        added = self._write(self._record_donation, donor_id, self.current_user['username'], items)
+        if added is None:
+            print("Donor not registered.")
+            return
+
+        for entry in added:
+            self.availability.add(*entry)
+        print("Donation recorded successfully.")
+
+        # Tell clients whose open needs the new items satisfy
+        matcher = self._need_matcher()
+        for item, (item_id, name, category_id, _) in zip(items, added):
+            matcher.add_item(item_id, category_id, name, item.get('description'))
+        matches = matcher.needs_for_items(entry[0] for entry in added)
+        if matches:
+            self._write(self._record_matches, matches)
+            clients = {matcher.needs[need_pk][0] for need_pk in matches if need_pk in matcher.needs}
+            print(f"Notified {len(clients)} client(s) of matching items.")
+
+    def _record_donation(self, cursor, donor_id, staff_username, items):
+        """Insert a donation and its items; None if the donor is unknown"""
+        # Verify donor exists; IDs of merged donors still resolve
+        donor_id = donors.resolve_donor(cursor, donor_id)
+        if donor_id is None:
+            return None
+
+        # Generate donation ID
+        donation_id = str(uuid.uuid4())
+
+        # Record donation
+        cursor.execute('''
+            INSERT INTO donations (donation_id, donor_id, staff_username)
+            VALUES (?, ?, ?)
+        ''', (donation_id, donor_id, staff_username))
+
+        # Insert items
+        added = []
+        for item in items:
+            item_id = item.get('item_id', str(uuid.uuid4()))
+            cursor.execute('''
+                INSERT INTO items (item_id, category_id, name, description, location)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                item_id, 
+                item.get('category_id'), 
+                item.get('name'), 
+                item.get('description'), 
+                item.get('location')
+            ))
+            added.append((item_id, item.get('name'), item.get('category_id'), item.get('location')))
+        return added
+
+    def _donor_index(self) -> donors.DonorIndex:
+        """The donor matching index shared by this database's sessions,
+        built on first use"""
+        if self._donors is None:
+            self._donors = shared_state(self._database, 'donors', self._build_donor_index)
+        return self._donors
+
+    def _build_donor_index(self) -> donors.DonorIndex:
+        index = donors.DonorIndex()
+        index.rebuild(self.db_path)
+        return index
+
+    @requires_permission('register_donor')
+    def register_donor(self, name: str, contact_info: Optional[str] = None,
+                       force: bool = False) -> Optional[str]:
+        """Register a donor, refusing likely duplicates unless forced"""
+        index = self._donor_index()
+        if not force:
+            matches = index.matches(name, contact_info)
+            if matches:
+                for score, donor_id, match_name in matches[:5]:
+                    print(f"Possible duplicate ({score:.2f}): {match_name} [{donor_id}]")
+                return None
+
+        donor_id = str(uuid.uuid4())
+        self._write(self._insert_donor, donor_id, name, contact_info)
+        index.add(donor_id, name, contact_info)
+        print(f"Donor {name} registered.")
+        return donor_id
+
+    def _insert_donor(self, cursor, donor_id, name, contact_info):
+        cursor.execute('''
+            INSERT INTO donors (donor_id, name, contact_info)
+            VALUES (?, ?, ?)
+        ''', (donor_id, name, contact_info))
+
+    @requires_permission('search_donors', default=list)
+    def search_donors(self, query: str, limit: int = 10) -> List[Tuple[str, str, str, float]]:
+        """Search-as-you-type over donor names and contacts"""
+        return self._donor_index().search(query, limit)
+
+    @requires_permission('manage_donors', default=list)
+    def find_duplicate_donors(self, threshold: Optional[float] = None) -> List[Tuple[float, str, str]]:
+        """Likely duplicate donor pairs as (score, donor_id, donor_id)"""
+        return self._donor_index().duplicates(threshold)
+
+    @requires_permission('manage_donors')
+    def merge_donors(self, keep_id: str, merge_ids: List[str]) -> Optional[List[str]]:
+        """Fold duplicate donors into one; their donations move with them"""
+        outcome = self._write(donors.merge_donors, keep_id, list(merge_ids))
+        if outcome is None:
+            print("Donor not found.")
+            return None
+
+        merged, contact_info = outcome
+        index = self._donor_index()
+        for donor_id in merged:
+            index.discard(donor_id)
+        index.set_contact(keep_id, contact_info)
+        print(f"Merged {len(merged)} donor(s) into {keep_id}.")
+        return merged
+
+    def _need_matcher(self, build: bool = True) -> Optional[matching.NeedMatcher]:
+        """The needs/items matching index shared by this database's
+        sessions, built on first use; None if no session has built it
+        yet and `build` is False"""
+        if self._matcher is None:
+            self._matcher = shared_state(self._database, 'matcher',
+                                         self._build_need_matcher if build else None)
+        return self._matcher
+
+    def _build_need_matcher(self) -> matching.NeedMatcher:
+        matcher = matching.NeedMatcher(self.categories)
+        matcher.rebuild(self.db_path)
+        return matcher
+
+    def _record_matches(self, cursor, matches):
+        cursor.executemany('''
+            INSERT OR IGNORE INTO need_matches (need_pk, item_pk)
+            SELECT ?, item_pk FROM items WHERE item_id = ?
+        ''', [(need_pk, item_id) for need_pk, item_ids in matches.items() for item_id in item_ids])
+
+    def _need_owner(self, client_username: Optional[str]) -> Optional[str]:
+        """Clients manage only their own needs; staff name the client"""
+        if self.current_user['role'] == 'client':
+            return self.current_user['username']
+        return client_username
+
+    @requires_permission('manage_needs')
+    def add_need(self, description: str, category: Optional[Union[int, str]] = None,
+                 client_username: Optional[str] = None) -> Optional[str]:
+        """Record something a client needs, e.g. 'winter coat' in 'Clothing'"""
+        client_username = self._need_owner(client_username)
+        category_id = None
+        if category is not None:
+            category_id = self._category_id(category)
+            if category_id is None:
+                print("Category not found.")
+                return None
+        words = matching.keywords(description)
+        if not words and category_id is None:
+            print("Describe the need or give a category.")
+            return None
+
+        created = self._write(self._insert_need, client_username, category_id, description, words)
+        if created is None:
+            print("Client not found.")
+            return None
+
+        need_pk, need_id = created
+        matcher = self._need_matcher()
+        matcher.add_need(need_pk, client_username, category_id, words)
+        available = len(matcher.items_for_need(category_id, words, limit=100))
+        print(f"Need recorded; {available}{'+' if available == 100 else ''} matching item(s) available now.")
+        return need_id
+
+    def _insert_need(self, cursor, client_username, category_id, description, words):
+        """Insert a need; None if the client does not exist"""
+        cursor.execute('SELECT 1 FROM users WHERE username = ?', (client_username,))
+        if not cursor.fetchone():
+            return None
+
+        need_id = str(uuid.uuid4())
+        cursor.execute('''
+            INSERT INTO client_needs (need_id, client_username, category_id, description, keywords)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (need_id, client_username, category_id, description, ' '.join(sorted(words))))
+        return cursor.lastrowid, need_id
+
+    @requires_permission('manage_needs')
+    def close_need(self, need_id: str, fulfilled: bool = True) -> bool:
+        """Mark a need fulfilled (or cancelled) so it stops matching"""
+        client_username = self._need_owner(None)
+        need_pk = self._write(self._close_need, need_id,
+                              'fulfilled' if fulfilled else 'cancelled', client_username)
+        if need_pk is None:
+            print("Open need not found.")
+            return False
+
+        matcher = self._need_matcher(build=False)
+        if matcher is not None:
+            matcher.discard_need(need_pk)
+        print("Need closed.")
+        return True
+
+    def _close_need(self, cursor, need_id, status, client_username=None):
+        cursor.execute('''
+            SELECT need_pk FROM client_needs
+            WHERE need_id = ? AND status = 'open' AND (? IS NULL OR client_username = ?)
+        ''', (need_id, client_username, client_username))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        cursor.execute('UPDATE client_needs SET status = ? WHERE need_pk = ?', (status, row[0]))
+        return row[0]
+
+    @requires_permission('manage_needs', default=list)
+    def list_needs(self, client_username: Optional[str] = None,
+                   status: Optional[str] = 'open') -> List[Tuple[str, str, str, Optional[int], str]]:
+        """Needs as (need_id, client_username, description, category_id, status)"""
+        client_username = self._need_owner(client_username)
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT need_id, client_username, description, category_id, status
+                FROM client_needs
+                WHERE (? IS NULL OR client_username = ?) AND (? IS NULL OR status = ?)
+                ORDER BY need_pk
+            ''', (client_username, client_username, status, status))
+            return cursor.fetchall()
+
+    @requires_permission('manage_needs', default=list)
+    def need_notifications(self, client_username: Optional[str] = None,
+                           unseen_only: bool = True) -> List[Tuple[str, str, str, str, str]]:
+        """Still-available items matched to a client's open needs, as
+        (need_id, description, item_id, item name, matched_at); marks them seen"""
+        client_username = self._need_owner(client_username)
+        return self._write(self._take_notifications, client_username, unseen_only)
+
+    def _take_notifications(self, cursor, client_username, unseen_only):
+        cursor.execute('''
+            SELECT n.need_pk, n.need_id, n.description, i.item_pk, i.item_id, i.name, m.matched_at
+            FROM client_needs n
+            JOIN need_matches m ON m.need_pk = n.need_pk
+            JOIN items i ON i.item_pk = m.item_pk
+            WHERE n.client_username = ? AND n.status = 'open' AND i.status = 'available'
+              AND (? = 0 OR m.seen = 0)
+            ORDER BY m.matched_at
+        ''', (client_username, int(unseen_only)))
+        rows = cursor.fetchall()
+        cursor.executemany('UPDATE need_matches SET seen = 1 WHERE need_pk = ? AND item_pk = ?',
+                           [(row[0], row[3]) for row in rows])
+        return [(need_id, description, item_id, name, matched_at)
+                for _, need_id, description, _, item_id, name, matched_at in rows]
+
+    def _suggestions(self, client_username: str, limit: int = 10) -> List[Tuple[str, str, str, str]]:
+        """Available items for a client's open needs, as (need_id, item_id, name, location)"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT need_id, category_id, keywords FROM client_needs
+                WHERE client_username = ? AND status = 'open'
+                ORDER BY need_pk
+            ''', (client_username,))
+            needs = cursor.fetchall()
+        if not needs:
+            return []
+
+        matcher = self._need_matcher()
+        suggestions = []
+        for need_id, category_id, words in needs:
+            for item_id in matcher.items_for_need(category_id, frozenset(words.split()),
+                                                  limit - len(suggestions)):
+                entry = self.availability.items.get(item_id)
+                if entry is not None:
+                    suggestions.append((need_id, item_id, entry[0], entry[2]))
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    @requires_permission('manage_needs', default=list)
+    def suggest_items(self, client_username: Optional[str] = None,
+                      limit: int = 10) -> List[Tuple[str, str, str, str]]:
+        """Available items matching a client's open needs, as
+        (need_id, item_id, name, location)"""
+        return self._suggestions(self._need_owner(client_username), limit)
+
+    @requires_permission('start_order')
+    def start_order(self, client_username: str, delivery_region: Optional[str] = None):
+        """Start a new order for a client"""
+        order_id = self._write(self._insert_order, client_username, delivery_region)
+        if order_id is None:
+            print("Client not found.")
+            return None
+
+        self.current_order = order_id
+        for need_id, item_id, name, location in self._suggestions(client_username, limit=10):
+            print(f"Suggested for {client_username}: {name} ({item_id}) at {location}")
+        return order_id
+
+    def _insert_order(self, cursor, client_username, delivery_region=None):
+        """Create an order; None if the client does not exist"""
+        # Verify client exists
+        cursor.execute('SELECT * FROM users WHERE username = ?', (client_username,))
+        if not cursor.fetchone():
+            return None
+
+        order_id = str(uuid.uuid4())
+        cursor.execute('''
+            INSERT INTO orders (order_id, client_username, delivery_region)
+            VALUES (?, ?, ?)
+        ''', (order_id, client_username, delivery_region))
+        return order_id
+
+    @requires_permission('add_to_order')
+    def add_to_order(self, item_id: str):
+        """Add item to current order"""
+        if not self.current_order:
+            print("No active order. Start an order first.")
+            return
+
+        if not self._write(self._order_item, self.current_order, item_id):
+            print("Item not available, or the order is no longer in progress.")
+            return
+
+        self.availability.discard(item_id)
+        matcher = self._need_matcher(build=False)
+        if matcher is not None:
+            matcher.discard_items(item_id)
+        print("Item added to order.")
+
+    def _order_item(self, cursor, order_id, item_id) -> bool:
+        """Move an available item into an in-progress order; False if the
+        item is not available or the order was already prepared"""
+        # Check both inside the INSERT: it holds the write lock while
+        # reading, so two sessions can't both claim the same item, and no
+        # item joins an order after it has been prepared
+        cursor.execute('''
+            INSERT INTO order_items (order_pk, item_pk)
+            SELECT o.order_pk, i.item_pk FROM orders o, items i
+            WHERE o.order_id = ? AND o.status = 'in_progress'
+            AND i.item_id = ? AND i.status = 'available'
+        ''', (order_id, item_id))
+        if cursor.rowcount == 0:
+            return False
+
+        # Mark as ordered
+        cursor.execute('''
+            UPDATE items
+            SET status = 'ordered'
+            WHERE item_id = ?
+        ''', (item_id,))
+        return True
+
+    @requires_permission('prepare_order')
+    def prepare_order(self, order_id: str):
+        """Update items in an order to ready for delivery"""
+        item_ids = self._write(self._mark_order_ready, order_id)
+        if item_ids is None:
+            print("Order not found or no longer in progress.")
+            return
+        self.availability.discard(*item_ids)
+        matcher = self._need_matcher(build=False)
+        if matcher is not None:
+            matcher.discard_items(*item_ids)
+        print("Order prepared for delivery.")
+
+    def _mark_order_ready(self, cursor, order_id) -> Optional[List[str]]:
+        """Move an in-progress order's items to delivery holding; returns
+        their IDs, or None if there is no such order in progress"""
+        # Only orders still being filled: a dispatched or delivered order
+        # must not go back into the delivery queue
+        cursor.execute('''
+            UPDATE orders
+            SET status = 'ready_for_delivery'
+            WHERE order_id = ? AND status = 'in_progress'
+        ''', (order_id,))
+        if cursor.rowcount == 0:
+            return None
+
+        cursor.execute('''
+            SELECT i.item_id FROM orders o
+            JOIN order_items oi ON oi.order_pk = o.order_pk
+            JOIN items i ON i.item_pk = oi.item_pk
+            WHERE o.order_id = ?
+        ''', (order_id,))
+        item_ids = [row[0] for row in cursor.fetchall()]
+        
+        # Update items to 'ready' location
+        cursor.execute('''
+            UPDATE items 
+            SET location = 'delivery_holding', status = 'ready'
+            WHERE item_pk IN (
+                SELECT oi.item_pk FROM order_items oi
+                JOIN orders o ON o.order_pk = oi.order_pk
+                WHERE o.order_id = ?
+            )
+        ''', (order_id,))
+        return item_ids
+
+    @requires_permission('get_user_orders', default=list)
+    def get_user_orders(self) -> List[UserOrderRecord]:
+        """Get all orders related to the current user"""
+        if not self.current_user:
+            print("No user logged in.")
+            return []
+
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = UserOrderRecord.from_row
+            cursor.execute('''
+                SELECT order_id, status, created_at 
+                FROM orders 
+                WHERE client_username = ? OR EXISTS (
+                    SELECT 1 FROM order_items oi 
+                    JOIN items i ON oi.item_pk = i.item_pk 
+                    WHERE oi.order_pk = orders.order_pk
+                )
+            ''', (self.current_user['username'],))
+            return cursor.fetchall()
+
+    @requires_permission('list_records', default=list)
+    def list_orders(self, after: Optional[str] = None, limit: int = 500,
+                    columns: Optional[Sequence[str]] = None) -> List[OrderRecord]:
+        """One page of order records, in creation order, starting after the
+        order ID `after`; `columns` selects a subset (order_id is always kept)"""
+        record = self._listing_record(OrderRecord, columns, 'order_id')
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = record.from_row
+            cursor.execute(f'''
+                SELECT {', '.join(record._fields)}
+                FROM orders
+                WHERE order_pk > COALESCE((SELECT order_pk FROM orders WHERE order_id = ?), 0)
+                ORDER BY order_pk
+                LIMIT ?
+            ''', (after, limit))
+            return cursor.fetchall()
+
+    @requires_permission('list_records', default=list)
+    def list_items(self, status: Optional[str] = None, after: Optional[str] = None,
+                   limit: int = 500, columns: Optional[Sequence[str]] = None) -> List[ItemRecord]:
+        """One page of item records, in intake order, starting after the
+        item ID `after`; `columns` selects a subset (item_id is always kept)"""
+        record = self._listing_record(ItemRecord, columns, 'item_id')
+        status_filter, params = ('', ()) if status is None else ('AND status = ?', (status,))
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = record.from_row
+            cursor.execute(f'''
+                SELECT {', '.join(record._fields)}
+                FROM items
+                WHERE item_pk > COALESCE((SELECT item_pk FROM items WHERE item_id = ?), 0)
+                {status_filter}
+                ORDER BY item_pk
+                LIMIT ?
+            ''', (after,) + params + (limit,))
+            return cursor.fetchall()
+
+    @requires_permission('list_records', default=list)
+    def stream_orders(self, columns: Optional[Sequence[str]] = None,
+                      chunk_size: int = 1000) -> Iterator[OrderRecord]:
+        """Every order as a record, read `chunk_size` rows at a time"""
+        record = self._listing_record(OrderRecord, columns, 'order_id')
+        with self._connect() as conn:
+            yield from iter_records(conn.cursor(), f'''
+                SELECT {', '.join(record._fields)} FROM orders ORDER BY order_pk
+            ''', record=record, chunk_size=chunk_size)
+
+    @requires_permission('list_records', default=list)
+    def stream_items(self, status: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+                     chunk_size: int = 1000) -> Iterator[ItemRecord]:
+        """Every item (optionally with one status) as a record, read
+        `chunk_size` rows at a time"""
+        record = self._listing_record(ItemRecord, columns, 'item_id')
+        status_filter, params = ('', ()) if status is None else ('WHERE status = ?', (status,))
+        with self._connect() as conn:
+            yield from iter_records(conn.cursor(), f'''
+                SELECT {', '.join(record._fields)} FROM items {status_filter} ORDER BY item_pk
+            ''', params, record=record, chunk_size=chunk_size)
+
+    @staticmethod
+    def _listing_record(full: Type[Record], columns: Optional[Sequence[str]], key: str) -> Type[Record]:
+        """Record type for a listing, narrowed to the requested columns"""
+        if columns is None:
+            return full
+        return record_type(full.__name__, projection(columns, full._fields, key))
+
+    @requires_permission('browse_available', default=list)
+    def browse_available(self, category_id: Optional[int] = None,
+                         location: Optional[str] = None,
+                         include_subcategories: bool = True) -> List[Tuple[str, str, Optional[int], str]]:
+        """List available items by category and/or location from the in-memory index"""
+        if category_id is None or not include_subcategories:
+            return self.availability.browse(category_id, location)
+
+        results = []
+        for subcategory_id in self.categories.subtree_ids(category_id):
+            results.extend(self.availability.browse(subcategory_id, location))
+        return results
+
+    @requires_permission('check_availability', default=dict)
+    def check_availability_index(self, repair: bool = False) -> dict:
+        """Compare the availability index with the database, optionally rebuilding it"""
+        report = self.availability.check_consistency(self.db_path)
+        if repair and any(report.values()):
+            self.availability.rebuild(self.db_path)
+            print("Availability index rebuilt.")
+        return report
+
+    def _category_id(self, category: Union[int, str]) -> Optional[int]:
+        """Accept a category ID or a 'Parent/Child' path"""
+        if isinstance(category, str):
+            with self._connect() as conn:
+                return self.categories.resolve_path(conn.cursor(), category)
+        return category
+
+    def _reload_categories(self):
+        """Refresh the in-memory hierarchy after changing it"""
+        with self._connect() as conn:
+            self.categories.load(conn.cursor())
+
+    @requires_permission('manage_categories')
+    def add_category(self, name: str, parent: Optional[Union[int, str]] = None) -> Optional[int]:
+        """Create a category, optionally beneath a parent category"""
+        parent_id = self._category_id(parent) if parent is not None else None
+        if parent is not None and parent_id is None:
+            print("Parent category not found.")
+            return None
+
+        try:
+            category_id = self._write(self.categories.add_category, name, parent_id)
+        except sqlite3.IntegrityError:
+            print("Category already exists.")
+            return None
+        self._reload_categories()
+        print(f"Category {name} added.")
+        return category_id
+
+    @requires_permission('manage_categories')
+    def move_category(self, category: Union[int, str], new_parent: Optional[Union[int, str]]):
+        """Move a category and everything beneath it under a new parent"""
+        category_id = self._category_id(category)
+        parent_id = self._category_id(new_parent) if new_parent is not None else None
+        if category_id is None or (new_parent is not None and parent_id is None):
+            print("Category not found.")
+            return
+
+        try:
+            self._write(self.categories.move_category, category_id, parent_id)
+        except ValueError as e:
+            print(e)
+            return
+        except sqlite3.IntegrityError:
+            print("The new parent already has a category with that name.")
+            return
+        self._reload_categories()
+        print("Category moved.")
+
+    @requires_permission('search_categories', default=list)
+    def find_items_in_category(self, category: Union[int, str],
+                               status: Optional[str] = 'available') -> List[Tuple[str, str, int, str]]:
+        """Find items in a category or any of its subcategories"""
+        category_id = self._category_id(category)
+        if category_id is None:
+            print("Category not found.")
+            return []
+        with self._connect() as conn:
+            return self.categories.items_in_subtree(conn.cursor(), category_id, status)
+
+    @requires_permission('search_categories', default=dict)
+    def category_counts(self, category: Union[int, str],
+                        status: Optional[str] = 'available') -> Dict[int, int]:
+        """Item counts per category in a subtree, each including its subcategories"""
+        category_id = self._category_id(category)
+        if category_id is None:
+            print("Category not found.")
+            return {}
+        with self._connect() as conn:
+            return self.categories.subtree_counts(conn.cursor(), category_id, status)
+
+    @requires_permission('dispatch_deliveries', default=list)
+    def plan_deliveries(self, max_runs: Optional[int] = None) -> List[dict]:
+        """Preview how ready orders would be grouped into delivery runs"""
+        with self._connect() as conn:
+            return [{'region': run['region'], 'order_ids': run['order_ids'], 'items': run['items']}
+                    for run in self.dispatcher.plan(conn.cursor(), max_runs)]
+
+    @requires_permission('dispatch_deliveries', default=list)
+    def dispatch_deliveries(self, driver_username: Optional[str] = None,
+                            max_runs: Optional[int] = None) -> List[Tuple[str, Optional[str], List[str]]]:
+        """Assign ready orders to delivery runs and send them out"""
+        runs = self._write(self.dispatcher.dispatch, driver_username, max_runs)
+        print(f"Dispatched {len(runs)} delivery run(s).")
+        return runs
+
+    @requires_permission('complete_deliveries')
+    def complete_delivery_run(self, run_id: str, failed_order_ids: Tuple[str, ...] = ()):
+        """Record a finished run; orders that could not be delivered return to the queue"""
+        outcome = self._write(self.dispatcher.complete, run_id, list(failed_order_ids))
+        if outcome is None:
+            print("Delivery run not found or already completed.")
+            return None
+
+        delivered, returned = outcome
+        print(f"Delivered {delivered} order(s), returned {returned}.")
+        return outcome
+
+    @requires_permission('complete_deliveries', default=list)
+    def list_delivery_runs(self, status: Optional[str] = None):
+        """Delivery runs as (run_id, region, driver_username, status, order count)"""
+        with self._connect() as conn:
+            return self.dispatcher.runs(conn.cursor(), status)
+
+    @requires_permission('manage_attachments')
+    def attach_file(self, owner_type: str, owner_id: str, source: Union[str, BinaryIO],
+                    filename: Optional[str] = None, content_type: Optional[str] = None) -> Optional[str]:
+        """Attach a photo or file (path or binary file object) to an item or donation"""
+        if filename is None and isinstance(source, str):
+            filename = os.path.basename(source)
+        sha256, size, upload = self.attachments.stage(source)
+        try:
+            attachment_id = self._write(self.attachments.add, owner_type, owner_id,
+                                        sha256, size, filename, content_type, upload)
+        finally:
+            # Only ever our own staged copy: the stored blob may be shared
+            self.attachments.discard(upload)
+        if attachment_id is None:
+            print(f"No {owner_type} found with ID {owner_id}.")
+            return None
+
+        print(f"Attached {filename or sha256[:12]} to {owner_type} {owner_id}.")
+        return attachment_id
+
+    @requires_permission('view_attachments', default=list)
+    def list_attachments(self, owner_type: str, owner_id: str) -> List[Tuple[str, str, Optional[str], int, str]]:
+        """Attachments of an item or donation as (attachment_id, sha256, filename, size, created_at)"""
+        with self._connect() as conn:
+            return self.attachments.list(conn.cursor(), owner_type, owner_id)
+
+    @requires_permission('view_attachments', default=list)
+    def open_attachment(self, attachment_id: str, chunk_size: Optional[int] = None):
+        """Yield an attachment's contents in chunks"""
+        with self._connect() as conn:
+            sha256 = self.attachments.digest_for(conn.cursor(), attachment_id)
+        if sha256 is None:
+            print("Attachment not found.")
+            return
+        yield from self.attachments.iter_chunks(sha256, chunk_size)
+
+    @requires_permission('view_attachments')
+    def attachment_thumbnail(self, attachment_id: str, size: int = 128) -> Optional[bytes]:
+        """PNG thumbnail of an image attachment"""
+        with self._connect() as conn:
+            sha256 = self.attachments.digest_for(conn.cursor(), attachment_id)
+        if sha256 is None:
+            print("Attachment not found.")
+            return None
+        return self.attachments.thumbnail(sha256, size)
+
+    @requires_permission('manage_attachments')
+    def remove_attachment(self, attachment_id: str) -> bool:
+        """Remove an attachment; its file is deleted once nothing refers to it"""
+        sha256 = self._write(self.attachments.remove, attachment_id)
+        if sha256 is None:
+            print("Attachment not found.")
+            return False
+
+        self._write(self.attachments.delete_unreferenced, sha256)
+        print("Attachment removed.")
+        return True
+
+    def _reporting_engine(self) -> ReportingEngine:
+        """The database's reporting worker pool, started on first use"""
+        if self._reports is None or self._reports.closed:
+            self._reports = shared_state(self._database, 'reports',
+                                         lambda: ReportingEngine(self.db_path))
+        return self._reports
+
+    @requires_permission('run_reports', default=list)
+    def run_report(self, report: str, **params) -> List[tuple]:
+        """Run a read-only report (order_history, donor_history,
+        inventory_breakdown) in the reporting process pool"""
+        return self._reporting_engine().run(report, **params)
+
+    @requires_permission('run_reports', default=list)
+    def stream_report(self, report: str, **params):
+        """Yield a report's rows in chunks as they are produced"""
+        yield from self._reporting_engine().stream(report, **params)
+
+    def close(self):
+        """Stop background workers and flush pending login counters"""
+        # The pool is shared by every session, whichever one started it;
+        # later reports from any session start a new one
+        reports = shared_state(self._database, 'reports')
+        if reports is not None:
+            forget_state(self._database, 'reports', reports)
+            reports.close()
+        self._reports = None
+        self.login_limiter.flush()
+
+    def has_permission(self, permission: str) -> bool:
+        """Check whether the current user may perform an action"""
+        role = self.current_user['role'] if self.current_user else ANONYMOUS_ROLE
+        return self.permissions.is_allowed(role, permission)
+
+    @requires_permission('manage_permissions')
+    def grant_permission(self, role: str, permission: str):
+        """Grant a permission to a role"""
+        self.permissions.grant(role, permission)
+        print(f"Granted {permission} to {role}.")
+
+    @requires_permission('manage_permissions')
+    def revoke_permission(self, role: str, permission: str):
+        """Revoke a permission from a role"""
+        self.permissions.revoke(role, permission)
+        print(f"Revoked {permission} from {role}.")
+
+# Example usage demonstration
+def main():
+    app = WelcomeHomeApp()
+    
+    # Register users
+    app.register_user('admin', 'password123', 'staff')
+    app.register_user('client1', 'clientpass', 'client')
+    
+    # Login
+    if app.login('admin', 'password123'):
+        # Add some sample categories and items
+        # Implement more interactive methods as needed
+        pass
+
+if __name__ == '__main__':
+    main()
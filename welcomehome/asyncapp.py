@@ -0,0 +1,320 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+
+from .app import WelcomeHomeApp
+from .records import ItemRecord, OrderItemRecord, OrderRecord, UserOrderRecord
+
+
+def _resolve(future: asyncio.Future, result, error):
+    """Complete an asyncio future from the event loop thread"""
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SQLiteExecutor:
+    def __init__(self, db_path='welcomehome.db', workers: int = 4, max_pending: int = 256):
+        """Fixed pool of threads, each with its own SQLite connection.
+
+        At most `max_pending` calls are queued or running at once; further
+        awaiting callers wait on the event loop, so thousands of concurrent
+        requests never mean more than `workers` threads."""
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._threads = [threading.Thread(target=self._work, name=f"welcomehome-sqlite-{n}", daemon=True)
+                         for n in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path)
+        return conn
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a worker thread and await the result"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        future = loop.create_future()
+        # Never blocks: the semaphore keeps us within the queue's bound. The
+        # slot is given back by the worker once the call has run, not when
+        # the caller stops waiting, since a cancelled call stays queued
+        self._queue.put_nowait((loop, future, fn, args, kwargs))
+        return await future
+
+    def _finish(self, future: asyncio.Future, result, error):
+        """Complete a call from the event loop thread and free its slot"""
+        self._slots.release()
+        _resolve(future, result, error)
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                break
+            loop, future, fn, args, kwargs = task
+            try:
+                result, error = fn(*args, **kwargs), None
+            except Exception as e:
+                result, error = None, e
+            loop.call_soon_threadsafe(self._finish, future, result, error)
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        """Stop worker threads once queued calls have run"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class AsyncWelcomeHomeBackend:
+    def __init__(self, executor: SQLiteExecutor, app: WelcomeHomeApp, page_size: int = 500):
+        """What every async session on one database shares: the executor,
+        and a WelcomeHomeApp whose in-memory state, writer and per-thread
+        connections each session reuses. Create it with `await open(...)`,
+        then hand each client its own `session()`."""
+        self.executor = executor
+        self.app = app
+        self.page_size = page_size
+
+    @classmethod
+    async def open(cls, db_path='welcomehome.db', workers: int = 4, max_pending: int = 256,
+                   page_size: int = 500, **app_options) -> 'AsyncWelcomeHomeBackend':
+        """Set the database up on an executor thread, keeping schema setup
+        and index builds off the event loop; `app_options` are passed to
+        WelcomeHomeApp"""
+        executor = SQLiteExecutor(db_path, workers, max_pending)
+        app = await executor.run(WelcomeHomeApp, db_path,
+                                 connection_factory=executor.connection, **app_options)
+        return cls(executor, app, page_size)
+
+    def session(self) -> 'AsyncWelcomeHomeApp':
+        """A new logged-out session, e.g. one per client connection"""
+        return AsyncWelcomeHomeApp(self)
+
+    async def close(self):
+        """Stop reporting workers and executor threads"""
+        await self.executor.run(self.app.close)
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.close)
+
+
+class AsyncWelcomeHomeApp:
+    def __init__(self, backend: AsyncWelcomeHomeBackend):
+        """Awaitable front end to WelcomeHomeApp for asyncio servers.
+
+        One per client: the logged-in user and open order belong to this
+        session alone, while calls run on the backend's shared executor,
+        whose threads reuse their own connections."""
+        self.backend = backend
+        self.executor = backend.executor
+        self.page_size = backend.page_size
+        self.app = backend.app.session()
+
+    @property
+    def current_user(self):
+        return self.app.current_user
+
+    @property
+    def current_order(self):
+        return self.app.current_order
+
+    async def _call(self, method, *args, **kwargs):
+        return await self.executor.run(method, *args, **kwargs)
+
+    async def register_user(self, username: str, password: str, role: str):
+        return await self._call(self.app.register_user, username, password, role)
+
+    async def assignable_roles(self) -> List[str]:
+        return await self._call(self.app.assignable_roles)
+
+    async def login(self, username: str, password: str, client: str = 'local') -> bool:
+        return await self._call(self.app.login, username, password, client)
+
+    async def find_item_locations(self, item_id: str) -> List[str]:
+        return await self._call(self.app.find_item_locations, item_id)
+
+    async def find_order_items(self, order_id: str) -> List[OrderItemRecord]:
+        return await self._call(self.app.find_order_items, order_id)
+
+    async def accept_donation(self, donor_id: str, items: List[dict]):
+        return await self._call(self.app.accept_donation, donor_id, items)
+
+    async def register_donor(self, name: str, contact_info: Optional[str] = None,
+                             force: bool = False) -> Optional[str]:
+        return await self._call(self.app.register_donor, name, contact_info, force)
+
+    async def search_donors(self, query: str, limit: int = 10):
+        return await self._call(self.app.search_donors, query, limit)
+
+    async def find_duplicate_donors(self, threshold: Optional[float] = None):
+        return await self._call(self.app.find_duplicate_donors, threshold)
+
+    async def merge_donors(self, keep_id: str, merge_ids: List[str]):
+        return await self._call(self.app.merge_donors, keep_id, merge_ids)
+
+    async def start_order(self, client_username: str,
+                          delivery_region: Optional[str] = None) -> Optional[str]:
+        return await self._call(self.app.start_order, client_username, delivery_region)
+
+    async def add_need(self, description: str, category: Optional[Union[int, str]] = None,
+                       client_username: Optional[str] = None) -> Optional[str]:
+        return await self._call(self.app.add_need, description, category, client_username)
+
+    async def close_need(self, need_id: str, fulfilled: bool = True) -> bool:
+        return await self._call(self.app.close_need, need_id, fulfilled)
+
+    async def list_needs(self, client_username: Optional[str] = None,
+                         status: Optional[str] = 'open'):
+        return await self._call(self.app.list_needs, client_username, status)
+
+    async def need_notifications(self, client_username: Optional[str] = None,
+                                 unseen_only: bool = True):
+        return await self._call(self.app.need_notifications, client_username, unseen_only)
+
+    async def suggest_items(self, client_username: Optional[str] = None, limit: int = 10):
+        return await self._call(self.app.suggest_items, client_username, limit)
+
+    async def add_to_order(self, item_id: str):
+        return await self._call(self.app.add_to_order, item_id)
+
+    async def prepare_order(self, order_id: str):
+        return await self._call(self.app.prepare_order, order_id)
+
+    async def get_user_orders(self) -> List[UserOrderRecord]:
+        return await self._call(self.app.get_user_orders)
+
+    async def list_orders(self, after: Optional[str] = None, limit: int = 500,
+                          columns: Optional[Sequence[str]] = None) -> List[OrderRecord]:
+        return await self._call(self.app.list_orders, after, limit, columns)
+
+    async def list_items(self, status: Optional[str] = None, after: Optional[str] = None,
+                         limit: int = 500, columns: Optional[Sequence[str]] = None) -> List[ItemRecord]:
+        return await self._call(self.app.list_items, status, after, limit, columns)
+
+    async def browse_available(self, category_id: Optional[int] = None,
+                               location: Optional[str] = None,
+                               include_subcategories: bool = True):
+        return await self._call(self.app.browse_available, category_id, location,
+                                include_subcategories)
+
+    async def check_availability_index(self, repair: bool = False) -> dict:
+        return await self._call(self.app.check_availability_index, repair)
+
+    async def add_category(self, name: str, parent: Optional[Union[int, str]] = None):
+        return await self._call(self.app.add_category, name, parent)
+
+    async def move_category(self, category: Union[int, str], new_parent: Optional[Union[int, str]]):
+        return await self._call(self.app.move_category, category, new_parent)
+
+    async def find_items_in_category(self, category: Union[int, str],
+                                     status: Optional[str] = 'available'):
+        return await self._call(self.app.find_items_in_category, category, status)
+
+    async def category_counts(self, category: Union[int, str],
+                              status: Optional[str] = 'available') -> Dict[int, int]:
+        return await self._call(self.app.category_counts, category, status)
+
+    async def plan_deliveries(self, max_runs: Optional[int] = None) -> List[dict]:
+        return await self._call(self.app.plan_deliveries, max_runs)
+
+    async def dispatch_deliveries(self, driver_username: Optional[str] = None,
+                                  max_runs: Optional[int] = None):
+        return await self._call(self.app.dispatch_deliveries, driver_username, max_runs)
+
+    async def complete_delivery_run(self, run_id: str, failed_order_ids: Tuple[str, ...] = ()):
+        return await self._call(self.app.complete_delivery_run, run_id, failed_order_ids)
+
+    async def list_delivery_runs(self, status: Optional[str] = None):
+        return await self._call(self.app.list_delivery_runs, status)
+
+    async def attach_file(self, owner_type: str, owner_id: str, source: Union[str, BinaryIO],
+                          filename: Optional[str] = None,
+                          content_type: Optional[str] = None) -> Optional[str]:
+        return await self._call(self.app.attach_file, owner_type, owner_id, source,
+                                filename, content_type)
+
+    async def list_attachments(self, owner_type: str, owner_id: str):
+        return await self._call(self.app.list_attachments, owner_type, owner_id)
+
+    async def open_attachment(self, attachment_id: str,
+                              chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Iterate over an attachment's contents, one chunk per executor call"""
+        chunks = iter(await self._call(self.app.open_attachment, attachment_id, chunk_size))
+        while True:
+            chunk = await self._call(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    async def attachment_thumbnail(self, attachment_id: str, size: int = 128) -> Optional[bytes]:
+        return await self._call(self.app.attachment_thumbnail, attachment_id, size)
+
+    async def remove_attachment(self, attachment_id: str) -> bool:
+        return await self._call(self.app.remove_attachment, attachment_id)
+
+    async def run_report(self, report: str, **params) -> List[tuple]:
+        return await self._call(self.app.run_report, report, **params)
+
+    async def stream_report(self, report: str, **params) -> AsyncIterator[List[tuple]]:
+        """Iterate over a report's row chunks as the reporting pool produces them"""
+        chunks = iter(await self._call(self.app.stream_report, report, **params))
+        while True:
+            rows = await self._call(next, chunks, None)
+            if rows is None:
+                return
+            yield rows
+
+    async def grant_permission(self, role: str, permission: str):
+        return await self._call(self.app.grant_permission, role, permission)
+
+    async def revoke_permission(self, role: str, permission: str):
+        return await self._call(self.app.revoke_permission, role, permission)
+
+    def logout(self):
+        """End this session; nothing to wait for"""
+        self.app.logout()
+
+    def has_permission(self, permission: str) -> bool:
+        """In-memory check once the role's permissions are cached"""
+        return self.app.has_permission(permission)
+
+    async def iter_orders(self, columns: Optional[Sequence[str]] = None) -> AsyncIterator[OrderRecord]:
+        """Iterate over all orders, one page per executor call; the async
+        counterpart of stream_orders, whose cursor can't hop threads"""
+        after = None
+        while True:
+            page = await self.list_orders(after, self.page_size, columns)
+            for row in page:
+                yield row
+            if len(page) < self.page_size:
+                return
+            after = page[-1].order_id
+
+    async def iter_items(self, status: Optional[str] = None,
+                         columns: Optional[Sequence[str]] = None) -> AsyncIterator[ItemRecord]:
+        """Iterate over all items, optionally with one status, page by page"""
+        after = None
+        while True:
+            page = await self.list_items(status, after, self.page_size, columns)
+            for row in page:
+                yield row
+            if len(page) < self.page_size:
+                return
+            after = page[-1].item_id
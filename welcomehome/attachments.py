@@ -0,0 +1,235 @@
+import contextlib
+import hashlib
+import io
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+# Owner type -> (table, public ID column, internal key column)
+OWNERS = {
+    'item': ('items', 'item_id', 'item_pk'),
+    'donation': ('donations', 'donation_id', 'donation_pk'),
+}
+
+
+class AttachmentStore:
+    def __init__(self, db_path='welcomehome.db', blob_dir: Optional[str] = None,
+                 chunk_size: int = 64 * 1024, thumbnail_cache_size: int = 128):
+        """Photos and other files for items and donations.
+
+        File contents live in a content-addressed directory, one file per
+        SHA-256 digest, so identical uploads are stored once. SQLite only
+        holds references: the blobs table (digest, size) and attachments
+        linking a blob to an item or donation. Files are only moved into
+        place or deleted inside a write transaction that also changes
+        their blobs row, so the SQLite write lock orders them against
+        each other across threads and processes."""
+        self.db_path = db_path
+        self.blob_dir = blob_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)),
+                                                 'attachments')
+        self.chunk_size = chunk_size
+        self.thumbnail_cache_size = thumbnail_cache_size
+        self._thumbnails: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._create_tables()
+
+    def _create_tables(self):
+        """Create the blob and attachment reference tables"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            ) WITHOUT ROWID''')
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attachments (
+                attachment_pk INTEGER PRIMARY KEY,
+                attachment_id TEXT NOT NULL UNIQUE,
+                owner_type TEXT NOT NULL,
+                owner_pk INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                filename TEXT,
+                content_type TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(sha256) REFERENCES blobs(sha256)
+            )''')
+
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attachments_owner
+            ON attachments(owner_type, owner_pk)
+            ''')
+
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attachments_sha256
+            ON attachments(sha256)
+            ''')
+
+            conn.commit()
+
+    def blob_path(self, sha256: str) -> str:
+        """Where a blob lives: <blob_dir>/ab/cd/abcd..."""
+        return os.path.join(self.blob_dir, sha256[:2], sha256[2:4], sha256)
+
+    def stage(self, source: Union[str, BinaryIO]) -> Tuple[str, int, str]:
+        """Stream a file (path or binary file object) into a temporary
+        upload in the store in chunks, hashing as it goes; returns
+        (sha256, size, upload path) for add, which moves it into place"""
+        with contextlib.ExitStack() as stack:
+            if isinstance(source, str):
+                source = stack.enter_context(open(source, 'rb'))
+            digest, size = hashlib.sha256(), 0
+            fd, upload = tempfile.mkstemp(dir=self.blob_dir, suffix='.upload')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    while True:
+                        chunk = source.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+            except BaseException:
+                self.discard(upload)
+                raise
+        return digest.hexdigest(), size, upload
+
+    def discard(self, upload: str):
+        """Remove a staged upload that add did not use"""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(upload)
+
+    def _owner_pk(self, cursor, owner_type: str, owner_id: str) -> Optional[int]:
+        if owner_type not in OWNERS:
+            raise ValueError(f"Attachments can belong to: {', '.join(OWNERS)}")
+        table, id_column, pk_column = OWNERS[owner_type]
+        cursor.execute(f'SELECT {pk_column} FROM {table} WHERE {id_column} = ?', (owner_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def add(self, cursor, owner_type: str, owner_id: str, sha256: str, size: int,
+            filename: Optional[str] = None, content_type: Optional[str] = None,
+            upload: Optional[str] = None) -> Optional[str]:
+        """Write operation: link a blob to an item or donation, moving its
+        staged `upload` into place; returns the attachment ID, or None if
+        the owner does not exist (the upload is then left to discard)"""
+        owner_pk = self._owner_pk(cursor, owner_type, owner_id)
+        if owner_pk is None:
+            return None
+
+        attachment_id = str(uuid.uuid4())
+        cursor.execute('INSERT OR IGNORE INTO blobs (sha256, size) VALUES (?, ?)', (sha256, size))
+        cursor.execute('''
+            INSERT INTO attachments (attachment_id, owner_type, owner_pk, sha256, filename, content_type)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (attachment_id, owner_type, owner_pk, sha256, filename, content_type))
+        if upload is not None:
+            # Always replace, even when the file exists: a delete_unreferenced
+            # that committed before this transaction may have just removed it
+            target = self.blob_path(sha256)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(upload, target)
+        return attachment_id
+
+    def remove(self, cursor, attachment_id: str) -> Optional[str]:
+        """Write operation: drop an attachment reference; returns its blob's
+        digest for delete_unreferenced, or None if there was no attachment"""
+        cursor.execute('SELECT sha256 FROM attachments WHERE attachment_id = ?', (attachment_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        cursor.execute('DELETE FROM attachments WHERE attachment_id = ?', (attachment_id,))
+        return row[0]
+
+    def delete_unreferenced(self, cursor, sha256: str) -> bool:
+        """Write operation: delete a blob, file included, if no attachment
+        refers to it any more; True if it was deleted"""
+        # The DELETE takes the write lock before the file goes, so an add
+        # of the same content either committed first and keeps the blob,
+        # or runs after and puts the file back
+        cursor.execute('''
+            DELETE FROM blobs WHERE sha256 = ?
+            AND NOT EXISTS (SELECT 1 FROM attachments WHERE sha256 = ?)
+        ''', (sha256, sha256))
+        if cursor.rowcount != 1:
+            return False
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.blob_path(sha256))
+        with self._lock:
+            for key in [key for key in self._thumbnails if key[0] == sha256]:
+                del self._thumbnails[key]
+        return True
+
+    def list(self, cursor, owner_type: str, owner_id: str) -> List[Tuple[str, str, Optional[str], int, str]]:
+        """(attachment_id, sha256, filename, size, created_at) for an owner"""
+        owner_pk = self._owner_pk(cursor, owner_type, owner_id)
+        cursor.execute('''
+            SELECT a.attachment_id, a.sha256, a.filename, b.size, a.created_at
+            FROM attachments a
+            JOIN blobs b ON b.sha256 = a.sha256
+            WHERE a.owner_type = ? AND a.owner_pk = ?
+            ORDER BY a.attachment_pk
+        ''', (owner_type, owner_pk))
+        return cursor.fetchall()
+
+    def digest_for(self, cursor, attachment_id: str) -> Optional[str]:
+        cursor.execute('SELECT sha256 FROM attachments WHERE attachment_id = ?', (attachment_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @contextlib.contextmanager
+    def mapped(self, sha256: str):
+        """Memory-map a blob read-only; yields a memoryview over it"""
+        with open(self.blob_path(sha256), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b'')
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                view = memoryview(mapping)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def iter_chunks(self, sha256: str, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """Stream a blob in chunks read from its memory map"""
+        chunk_size = chunk_size or self.chunk_size
+        with self.mapped(sha256) as view:
+            for offset in range(0, len(view), chunk_size):
+                yield view[offset:offset + chunk_size].tobytes()
+
+    def thumbnail(self, sha256: str, size: int = 128) -> bytes:
+        """PNG thumbnail of an image blob, made on first request and kept
+        in an LRU cache. Needs Pillow (the 'thumbnails' extra)."""
+        key = (sha256, size)
+        with self._lock:
+            if key in self._thumbnails:
+                self._thumbnails.move_to_end(key)
+                return self._thumbnails[key]
+
+        try:
+            from PIL import Image
+        except ImportError:
+            raise RuntimeError("Thumbnails need Pillow: pip install welcomehome[thumbnails]")
+
+        with self.mapped(sha256) as view:
+            with Image.open(io.BytesIO(view)) as image:
+                image.thumbnail((size, size))
+                out = io.BytesIO()
+                image.save(out, format='PNG')
+        png = out.getvalue()
+
+        with self._lock:
+            self._thumbnails[key] = png
+            self._thumbnails.move_to_end(key)
+            while len(self._thumbnails) > self.thumbnail_cache_size:
+                self._thumbnails.popitem(last=False)
+        return png
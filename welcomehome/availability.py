@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+# Every available item is held as item_id -> (name, category_id, location)
+ItemEntry = Tuple[str, Optional[int], str]
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        """In-process index of available items by category and by location"""
+        self.items: Dict[str, ItemEntry] = {}
+        self.by_category: Dict[Optional[int], Set[str]] = {}
+        self.by_location: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, db_path: str):
+        """Replace the index contents with the available items in the database"""
+        with sqlite3.connect(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT item_id, name, category_id, location
+                FROM items WHERE status = 'available'
+            ''')
+            rows = cursor.fetchall()
+
+        items, by_category, by_location = {}, {}, {}
+        for item_id, name, category_id, location in rows:
+            items[item_id] = (name, category_id, location)
+            by_category.setdefault(category_id, set()).add(item_id)
+            by_location.setdefault(location, set()).add(item_id)
+
+        with self._lock:
+            self.items, self.by_category, self.by_location = items, by_category, by_location
+
+    def add(self, item_id: str, name: str, category_id: Optional[int], location: str):
+        """Record an item as available"""
+        with self._lock:
+            self._discard(item_id)
+            self.items[item_id] = (name, category_id, location)
+            self.by_category.setdefault(category_id, set()).add(item_id)
+            self.by_location.setdefault(location, set()).add(item_id)
+
+    def discard(self, *item_ids: str):
+        """Remove items that are no longer available"""
+        with self._lock:
+            for item_id in item_ids:
+                self._discard(item_id)
+
+    def _discard(self, item_id: str):
+        entry = self.items.pop(item_id, None)
+        if entry is None:
+            return
+        _, category_id, location = entry
+        for buckets, key in ((self.by_category, category_id), (self.by_location, location)):
+            bucket = buckets[key]
+            bucket.discard(item_id)
+            if not bucket:
+                del buckets[key]
+
+    def browse(self, category_id: Optional[int] = None,
+               location: Optional[str] = None) -> List[Tuple[str, str, Optional[int], str]]:
+        """Available items, optionally filtered by category and/or location,
+        as (item_id, name, category_id, location) tuples"""
+        with self._lock:
+            if category_id is not None and location is not None:
+                small, large = sorted((self.by_category.get(category_id, set()),
+                                       self.by_location.get(location, set())), key=len)
+                item_ids = [item_id for item_id in small if item_id in large]
+            elif category_id is not None:
+                item_ids = list(self.by_category.get(category_id, ()))
+            elif location is not None:
+                item_ids = list(self.by_location.get(location, ()))
+            else:
+                item_ids = list(self.items)
+            return [(item_id,) + self.items[item_id] for item_id in item_ids]
+
+    def counts(self) -> Dict[str, Dict]:
+        """Number of available items per category and per location"""
+        with self._lock:
+            return {
+                'category': {key: len(ids) for key, ids in self.by_category.items()},
+                'location': {key: len(ids) for key, ids in self.by_location.items()},
+            }
+
+    def check_consistency(self, db_path: str) -> Dict[str, List[str]]:
+        """Compare the index against the database.
+
+        Returns item IDs missing from the index, present but no longer
+        available, and indexed under the wrong name, category or location.
+        All lists are empty when the index is consistent."""
+        with sqlite3.connect(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT item_id, name, category_id, location
+                FROM items WHERE status = 'available'
+            ''')
+            expected = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+        with self._lock:
+            indexed = dict(self.items)
+            misfiled = [item_id for item_id, (_, category_id, location) in indexed.items()
+                        if item_id not in self.by_category.get(category_id, ())
+                        or item_id not in self.by_location.get(location, ())]
+
+        return {
+            'missing': sorted(expected.keys() - indexed.keys()),
+            'stale': sorted(indexed.keys() - expected.keys()),
+            'mismatched': sorted(set(misfiled) | {
+                item_id for item_id in expected.keys() & indexed.keys()
+                if expected[item_id] != indexed[item_id]}),
+        }
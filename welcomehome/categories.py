@@ -0,0 +1,179 @@
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+
+def create_tables(cursor):
+    """Create the closure table and fill it in for existing categories"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS category_closure (
+        ancestor_id INTEGER NOT NULL,
+        descendant_id INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY(ancestor_id, descendant_id),
+        FOREIGN KEY(ancestor_id) REFERENCES categories(category_id),
+        FOREIGN KEY(descendant_id) REFERENCES categories(category_id)
+    ) WITHOUT ROWID''')
+
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_category_closure_descendant
+    ON category_closure(descendant_id, depth)
+    ''')
+
+    # Categories added before the closure table (or by direct SQL) have
+    # no self row; rebuild the closure from parent_id if so
+    cursor.execute('''
+        SELECT
+            (SELECT COUNT(*) FROM categories),
+            (SELECT COUNT(*) FROM category_closure WHERE depth = 0)
+    ''')
+    categories, closed = cursor.fetchone()
+    if categories != closed:
+        rebuild_closure(cursor)
+
+
+def rebuild_closure(cursor):
+    """Recompute the closure table from categories.parent_id"""
+    cursor.execute('DELETE FROM category_closure')
+    cursor.execute('''
+        WITH RECURSIVE closure(ancestor_id, descendant_id, depth) AS (
+            SELECT category_id, category_id, 0 FROM categories
+            UNION ALL
+            SELECT closure.ancestor_id, c.category_id, closure.depth + 1
+            FROM closure
+            JOIN categories c ON c.parent_id = closure.descendant_id
+        )
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, depth FROM closure
+    ''')
+
+
+class CategoryTree:
+    def __init__(self):
+        """Parent/child categories backed by a closure table.
+
+        category_closure holds one row per (ancestor, descendant) pair,
+        including each category paired with itself at depth 0, so a whole
+        subtree is a single primary-key range scan whatever its depth.
+        Queries and writes take a cursor from the caller's connection or
+        write transaction; the hierarchy itself is also kept in memory
+        (see load) for the matching and browsing hot paths."""
+        self._subtrees: Dict[int, FrozenSet[int]] = {}
+        self._ancestors: Dict[int, FrozenSet[int]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, cursor):
+        """Read the whole hierarchy into memory; call after it changes"""
+        # Reading and swapping under one lock means the last load to run
+        # also read last, so a slow reload can't put back an older tree
+        with self._lock:
+            cursor.execute('SELECT ancestor_id, descendant_id FROM category_closure')
+            subtrees: Dict[int, Set[int]] = defaultdict(set)
+            ancestors: Dict[int, Set[int]] = defaultdict(set)
+            for ancestor_id, descendant_id in cursor.fetchall():
+                subtrees[ancestor_id].add(descendant_id)
+                ancestors[descendant_id].add(ancestor_id)
+            self._subtrees = {key: frozenset(ids) for key, ids in subtrees.items()}
+            self._ancestors = {key: frozenset(ids) for key, ids in ancestors.items()}
+
+    def subtree_ids(self, category_id: int) -> FrozenSet[int]:
+        """IDs of a category and all of its descendants"""
+        return self._subtrees.get(category_id, frozenset((category_id,)))
+
+    def ancestor_ids(self, category_id: int) -> FrozenSet[int]:
+        """IDs of a category and all of its ancestors"""
+        return self._ancestors.get(category_id, frozenset((category_id,)))
+
+    def add_category(self, cursor, name: str, parent_id: Optional[int] = None) -> int:
+        """Create a category under `parent_id` (or at the top level)"""
+        cursor.execute('INSERT INTO categories (name, parent_id) VALUES (?, ?)',
+                       (name, parent_id))
+        category_id = cursor.lastrowid
+        cursor.execute('''
+            INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, ?, depth + 1
+            FROM category_closure WHERE descendant_id = ?
+            UNION ALL
+            SELECT ?, ?, 0
+        ''', (category_id, parent_id, category_id, category_id))
+        return category_id
+
+    def move_category(self, cursor, category_id: int, new_parent_id: Optional[int]):
+        """Re-parent a category together with its whole subtree"""
+        # Checked inside the write transaction, against the stored tree
+        cursor.execute('''
+            SELECT 1 FROM category_closure WHERE ancestor_id = ? AND descendant_id = ?
+        ''', (category_id, new_parent_id))
+        if cursor.fetchone():
+            raise ValueError("Cannot move a category beneath itself.")
+
+        # Detach the subtree from its old ancestors
+        cursor.execute('''
+            DELETE FROM category_closure
+            WHERE descendant_id IN (
+                SELECT descendant_id FROM category_closure WHERE ancestor_id = ?
+            ) AND ancestor_id NOT IN (
+                SELECT descendant_id FROM category_closure WHERE ancestor_id = ?
+            )
+        ''', (category_id, category_id))
+        # Attach it under each ancestor of the new parent
+        cursor.execute('''
+            INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+            SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+            FROM category_closure above, category_closure below
+            WHERE above.descendant_id = ? AND below.ancestor_id = ?
+        ''', (new_parent_id, category_id))
+        cursor.execute('UPDATE categories SET parent_id = ? WHERE category_id = ?',
+                       (new_parent_id, category_id))
+
+    def resolve_path(self, cursor, path: str) -> Optional[int]:
+        """Find a category by a '/'-separated path such as 'Furniture/Chairs'"""
+        category_id = None
+        for name in (part.strip() for part in path.split('/') if part.strip()):
+            cursor.execute('''
+                SELECT category_id FROM categories
+                WHERE name = ? AND parent_id IS ?
+            ''', (name, category_id))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            category_id = row[0]
+        return category_id
+
+    def children(self, cursor, category_id: Optional[int] = None) -> List[Tuple[int, str]]:
+        """Direct children of a category, or the top-level categories"""
+        cursor.execute('''
+            SELECT category_id, name FROM categories
+            WHERE parent_id IS ? ORDER BY name
+        ''', (category_id,))
+        return cursor.fetchall()
+
+    def items_in_subtree(self, cursor, category_id: int,
+                         status: Optional[str] = 'available') -> List[Tuple[str, str, int, str]]:
+        """(item_id, name, category_id, location) for items anywhere under a
+        category, optionally restricted to one status"""
+        # CROSS JOIN pins the closure table as the outer loop, so the plan
+        # is a range scan of the subtree and never a scan of items
+        status_filter, params = ('', ()) if status is None else ('AND i.status = ?', (status,))
+        cursor.execute(f'''
+            SELECT i.item_id, i.name, i.category_id, i.location
+            FROM category_closure cc
+            CROSS JOIN items i ON i.category_id = cc.descendant_id {status_filter}
+            WHERE cc.ancestor_id = ?
+        ''', params + (category_id,))
+        return cursor.fetchall()
+
+    def subtree_counts(self, cursor, category_id: int,
+                       status: Optional[str] = 'available') -> Dict[int, int]:
+        """Item count for each category in a subtree, including items in
+        that category's own descendants"""
+        status_filter, params = ('', ()) if status is None else ('AND i.status = ?', (status,))
+        cursor.execute(f'''
+            SELECT node.descendant_id, COUNT(i.item_pk)
+            FROM category_closure node
+            JOIN category_closure cc ON cc.ancestor_id = node.descendant_id
+            LEFT JOIN items i ON i.category_id = cc.descendant_id {status_filter}
+            WHERE node.ancestor_id = ?
+            GROUP BY node.descendant_id
+        ''', params + (category_id,))
+        return dict(cursor.fetchall())
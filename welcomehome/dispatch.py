@@ -0,0 +1,199 @@
+import heapq
+import sqlite3
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class DeliveryDispatcher:
+    def __init__(self, db_path='welcomehome.db', age_weight: float = 1.0, size_weight: float = 0.5,
+                 max_orders_per_run: int = 10, max_items_per_run: int = 60):
+        """Groups orders that are ready for delivery into delivery runs.
+
+        An order's priority is age_weight * hours waiting plus size_weight
+        * item count. Orders are taken from a heap in priority order and
+        packed into one open run per delivery region, each capped at
+        `max_orders_per_run` orders and `max_items_per_run` items.
+
+        Methods taking a cursor are write operations for
+        WelcomeHomeApp._write, so they share its transaction handling."""
+        self.db_path = db_path
+        self.age_weight = age_weight
+        self.size_weight = size_weight
+        self.max_orders_per_run = max_orders_per_run
+        self.max_items_per_run = max_items_per_run
+        self._create_tables()
+
+    def _create_tables(self):
+        """Create delivery run tables"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS delivery_runs (
+                run_pk INTEGER PRIMARY KEY,
+                run_id TEXT NOT NULL UNIQUE,
+                region TEXT,
+                driver_username TEXT,
+                status TEXT NOT NULL DEFAULT 'out',
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                completed_at DATETIME,
+                FOREIGN KEY(driver_username) REFERENCES users(username)
+            )''')
+
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_delivery_runs_status
+            ON delivery_runs(status)
+            ''')
+
+            # outcome: 'pending' while out, then 'delivered' or 'returned'
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS delivery_run_orders (
+                run_pk INTEGER NOT NULL,
+                order_pk INTEGER NOT NULL,
+                outcome TEXT NOT NULL DEFAULT 'pending',
+                PRIMARY KEY(run_pk, order_pk),
+                FOREIGN KEY(run_pk) REFERENCES delivery_runs(run_pk),
+                FOREIGN KEY(order_pk) REFERENCES orders(order_pk)
+            ) WITHOUT ROWID''')
+
+            # An order can only be out on one run at a time
+            cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_delivery_run_orders_pending
+            ON delivery_run_orders(order_pk) WHERE outcome = 'pending'
+            ''')
+
+            conn.commit()
+
+    def _pending_orders(self, cursor) -> List[Tuple[int, str, Optional[str], float, int]]:
+        """(order_pk, order_id, region, hours waiting, item count) for every
+        order ready for delivery, via the orders(status, created_at) index"""
+        cursor.execute('''
+            SELECT o.order_pk, o.order_id, o.delivery_region,
+                   (julianday('now') - julianday(o.created_at)) * 24,
+                   (SELECT COUNT(*) FROM order_items oi WHERE oi.order_pk = o.order_pk)
+            FROM orders o
+            WHERE o.status = 'ready_for_delivery'
+        ''')
+        return cursor.fetchall()
+
+    def plan(self, cursor, max_runs: Optional[int] = None) -> List[Dict]:
+        """Group ready orders into runs, highest priority first.
+
+        Runs rank by their best order, i.e. the order that opened them, so
+        with `max_runs` a region with a single old order still gets its run
+        ahead of busier regions' newer ones. Heapifying is linear, and
+        popping stops as soon as `max_runs` runs are full, so planning a
+        few runs in busy regions stays cheap with a large backlog."""
+        heap = [(-(self.age_weight * hours + self.size_weight * items), region or '', order_pk,
+                 order_id, region, items)
+                for order_pk, order_id, region, hours, items in self._pending_orders(cursor)]
+        heapq.heapify(heap)
+
+        # Runs in the order they were opened, which is their rank
+        runs, open_runs = [], {}
+        while heap:
+            _, _, order_pk, order_id, region, items = heapq.heappop(heap)
+            run = open_runs.get(region)
+            if run and run['items'] + items > self.max_items_per_run:
+                del open_runs[region]
+                run = None
+            if run is None:
+                if max_runs is not None and len(runs) >= max_runs:
+                    # A new run would rank below all chosen ones; keep
+                    # filling those that still have room
+                    if not open_runs:
+                        break
+                    continue
+                run = open_runs[region] = {'region': region, 'order_pks': [], 'order_ids': [], 'items': 0}
+                runs.append(run)
+            run['order_pks'].append(order_pk)
+            run['order_ids'].append(order_id)
+            run['items'] += items
+            if len(run['order_pks']) >= self.max_orders_per_run:
+                del open_runs[region]
+        return runs
+
+    def dispatch(self, cursor, driver_username: Optional[str] = None,
+                 max_runs: Optional[int] = None) -> List[Tuple[str, Optional[str], List[str]]]:
+        """Plan runs and record them, moving their orders to
+        'out_for_delivery'; returns (run_id, region, order_ids) per run"""
+        dispatched = []
+        for run in self.plan(cursor, max_runs):
+            run_id = str(uuid.uuid4())
+            cursor.execute('''
+                INSERT INTO delivery_runs (run_id, region, driver_username)
+                VALUES (?, ?, ?)
+            ''', (run_id, run['region'], driver_username))
+            run_pk = cursor.lastrowid
+            cursor.executemany('''
+                INSERT INTO delivery_run_orders (run_pk, order_pk) VALUES (?, ?)
+            ''', [(run_pk, order_pk) for order_pk in run['order_pks']])
+            cursor.executemany('''
+                UPDATE orders SET status = 'out_for_delivery'
+                WHERE order_pk = ? AND status = 'ready_for_delivery'
+            ''', [(order_pk,) for order_pk in run['order_pks']])
+            dispatched.append((run_id, run['region'], run['order_ids']))
+        return dispatched
+
+    def complete(self, cursor, run_id: str,
+                 failed_order_ids: Iterable[str] = ()) -> Optional[Tuple[int, int]]:
+        """Close a run: its orders and their items become 'delivered',
+        except `failed_order_ids`, which go back to 'ready_for_delivery'.
+
+        Returns (delivered, returned) counts, or None if the run is not out."""
+        cursor.execute('SELECT run_pk FROM delivery_runs WHERE run_id = ? AND status = ?',
+                       (run_id, 'out'))
+        run = cursor.fetchone()
+        if not run:
+            return None
+        run_pk = run[0]
+
+        cursor.execute('''
+            SELECT d.order_pk, o.order_id
+            FROM delivery_run_orders d
+            JOIN orders o ON o.order_pk = d.order_pk
+            WHERE d.run_pk = ?
+        ''', (run_pk,))
+        failed = set(failed_order_ids)
+        delivered, returned = [], []
+        for order_pk, order_id in cursor.fetchall():
+            (returned if order_id in failed else delivered).append((run_pk, order_pk))
+
+        cursor.executemany('''
+            UPDATE delivery_run_orders SET outcome = 'delivered'
+            WHERE run_pk = ? AND order_pk = ?
+        ''', delivered)
+        cursor.executemany('''
+            UPDATE orders SET status = 'delivered' WHERE order_pk = ?
+        ''', [(order_pk,) for _, order_pk in delivered])
+        cursor.executemany('''
+            UPDATE items SET status = 'delivered'
+            WHERE item_pk IN (SELECT item_pk FROM order_items WHERE order_pk = ?)
+        ''', [(order_pk,) for _, order_pk in delivered])
+
+        cursor.executemany('''
+            UPDATE delivery_run_orders SET outcome = 'returned'
+            WHERE run_pk = ? AND order_pk = ?
+        ''', returned)
+        cursor.executemany('''
+            UPDATE orders SET status = 'ready_for_delivery' WHERE order_pk = ?
+        ''', [(order_pk,) for _, order_pk in returned])
+
+        cursor.execute('''
+            UPDATE delivery_runs SET status = 'completed', completed_at = CURRENT_TIMESTAMP
+            WHERE run_pk = ?
+        ''', (run_pk,))
+        return len(delivered), len(returned)
+
+    def runs(self, cursor, status: Optional[str] = None) -> List[Tuple[str, Optional[str], str, str, int]]:
+        """(run_id, region, driver_username, status, order count) per run"""
+        status_filter, params = ('', ()) if status is None else ('WHERE r.status = ?', (status,))
+        cursor.execute(f'''
+            SELECT r.run_id, r.region, r.driver_username, r.status, COUNT(d.order_pk)
+            FROM delivery_runs r
+            LEFT JOIN delivery_run_orders d ON d.run_pk = r.run_pk
+            {status_filter}
+            GROUP BY r.run_pk
+            ORDER BY r.run_pk
+        ''', params)
+        return cursor.fetchall()
@@ -0,0 +1,465 @@
+import argparse
+import bisect
+import heapq
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import combinations, islice
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+HONORIFICS = {'mr', 'mrs', 'ms', 'miss', 'dr', 'prof', 'rev', 'sir', 'jr', 'sr', 'ii', 'iii'}
+
+_SOUNDEX_CODES = {}
+for _letters, _code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'),
+                        ('l', '4'), ('mn', '5'), ('r', '6')):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _code
+
+
+def normalize_name(name: Optional[str]) -> Tuple[str, ...]:
+    """Lower-case, accent-free name tokens without punctuation or honorifics"""
+    if not name:
+        return ()
+    if name.isascii():
+        text = name.lower()
+    else:
+        text = unicodedata.normalize('NFKD', name)
+        text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    tokens = re.findall(r"[a-z0-9]+", text.replace("'", ''))
+    return tuple(token for token in tokens if token not in HONORIFICS)
+
+
+def normalize_contact(contact: Optional[str]) -> str:
+    """Canonical contact: a lower-case email without +tags, or the last ten
+    digits of a phone number"""
+    if not contact:
+        return ''
+    contact = contact.strip().lower()
+    if '@' in contact:
+        local, _, domain = contact.partition('@')
+        return local.split('+', 1)[0] + '@' + domain
+    digits = re.sub(r'\D', '', contact)
+    return digits[-10:] if len(digits) >= 7 else contact
+
+
+@lru_cache(maxsize=65536)
+def soundex(token: str) -> str:
+    """American Soundex code, e.g. 'robert' -> 'R163'"""
+    if not token:
+        return ''
+    first, previous, code = token[0], _SOUNDEX_CODES.get(token[0]), []
+    for letter in token[1:]:
+        digit = _SOUNDEX_CODES.get(letter)
+        if digit and digit != previous:
+            code.append(digit)
+            if len(code) == 3:
+                break
+        if letter not in 'hw':
+            previous = digit
+    return (first.upper() + ''.join(code)).ljust(4, '0')
+
+
+@lru_cache(maxsize=65536)
+def _token_grams(padded: str) -> FrozenSet[str]:
+    return frozenset(padded[i:i + 3] for i in range(max(len(padded) - 2, 0)))
+
+
+def name_grams(tokens: Iterable[str], prefix_last: bool = False) -> FrozenSet[str]:
+    """Padded trigrams of each token; the last token is treated as a
+    prefix still being typed when `prefix_last` is set"""
+    tokens = list(tokens)
+    if prefix_last and tokens:
+        padded = [f' {token} ' for token in tokens[:-1]] + [' ' + tokens[-1]]
+    else:
+        padded = [f' {token} ' for token in tokens]
+    return frozenset().union(*map(_token_grams, padded))
+
+
+def blocking_keys(tokens: Tuple[str, ...], contact: str) -> Set[str]:
+    """Blocks a donor falls into: its contact, the phonetic codes of each
+    pair of name tokens (swapped order or a missing middle name still
+    meet), and each exact token with the other's initial (a typo that
+    changes one token's phonetic code still meets through the other)"""
+    keys = set()
+    if contact:
+        keys.add('c:' + contact)
+    tokens = set(tokens)
+    if len(tokens) == 1:
+        keys.add('p:' + soundex(next(iter(tokens))))
+    for a, b in combinations(sorted(tokens), 2):
+        keys.add(':'.join(['p'] + sorted((soundex(a), soundex(b)))))
+        keys.add(f'e:{a}:{b[0]}')
+        keys.add(f'e:{b}:{a[0]}')
+    return keys
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Dice coefficient of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def match_score(grams_a: FrozenSet[str], contact_a: str,
+                grams_b: FrozenSet[str], contact_b: str) -> float:
+    """Name similarity, raised by a shared contact and lowered by a
+    conflicting one"""
+    name_score = similarity(grams_a, grams_b)
+    if contact_a and contact_b:
+        if contact_a == contact_b:
+            return 0.5 + 0.5 * name_score
+        return 0.6 * name_score
+    return name_score
+
+
+class DonorIndex:
+    def __init__(self, threshold: float = 0.75, max_block_size: int = 100,
+                 max_prefix_tokens: int = 256):
+        """In-memory blocking index over donors for duplicate detection.
+
+        Candidate pairs are only scored within a block (same contact or
+        same phonetic name key). Blocks larger than `max_block_size` are
+        skipped as uninformative, so finding duplicates grows linearly
+        with the donor count rather than with its square. Name tokens
+        are also kept sorted for prefix search, with trigram postings as
+        a typo-tolerant fallback. Sessions share one index, so every
+        method holds a lock for its whole update or lookup."""
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+        self.max_prefix_tokens = max_prefix_tokens
+        self.donors: Dict[str, Tuple[str, str, FrozenSet[str], str, Tuple[str, ...]]] = {}
+        self.blocks: Dict[str, Set[str]] = defaultdict(set)
+        self.grams: Dict[str, Set[str]] = defaultdict(set)
+        self.tokens: Dict[str, Set[str]] = defaultdict(set)
+        self._sorted_tokens: Optional[List[str]] = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, db_path: str):
+        """Load all donors from the database"""
+        with sqlite3.connect(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT donor_id, name, contact_info FROM donors')
+            rows = cursor.fetchall()
+
+        with self._lock:
+            self.donors.clear()
+            self.blocks.clear()
+            self.grams.clear()
+            self.tokens.clear()
+            self._sorted_tokens = None
+            for donor_id, name, contact_info in rows:
+                self._add(donor_id, name, contact_info)
+
+    def add(self, donor_id: str, name: Optional[str], contact_info: Optional[str]):
+        """Index a donor, replacing any previous entry for it"""
+        with self._lock:
+            self._add(donor_id, name, contact_info)
+
+    def set_contact(self, donor_id: str, contact_info: Optional[str]):
+        """Re-index a donor under new contact details, keeping its name"""
+        with self._lock:
+            entry = self.donors.get(donor_id)
+            if entry is not None:
+                self._add(donor_id, entry[0], contact_info)
+
+    def _add(self, donor_id, name, contact_info):
+        if donor_id in self.donors:
+            self._discard(donor_id)
+        tokens = normalize_name(name)
+        contact = normalize_contact(contact_info)
+        grams = name_grams(tokens)
+        self.donors[donor_id] = (name or '', contact_info or '', grams, contact, tokens)
+        for key in blocking_keys(tokens, contact):
+            self.blocks[key].add(donor_id)
+        for gram in grams:
+            self.grams[gram].add(donor_id)
+        # A name may repeat a token ("Lee Lee"); each is indexed once
+        for token in set(tokens):
+            if token not in self.tokens and self._sorted_tokens is not None:
+                bisect.insort(self._sorted_tokens, token)
+            self.tokens[token].add(donor_id)
+
+    def discard(self, donor_id: str):
+        """Remove a donor from the index"""
+        with self._lock:
+            self._discard(donor_id)
+
+    def _discard(self, donor_id):
+        entry = self.donors.pop(donor_id, None)
+        if entry is None:
+            return
+        _, _, grams, contact, tokens = entry
+        for key in blocking_keys(tokens, contact):
+            self._drop(self.blocks, key, donor_id)
+        for gram in grams:
+            self._drop(self.grams, gram, donor_id)
+        for token in set(tokens):
+            self._drop(self.tokens, token, donor_id)
+            if token not in self.tokens and self._sorted_tokens is not None:
+                i = bisect.bisect_left(self._sorted_tokens, token)
+                if i < len(self._sorted_tokens) and self._sorted_tokens[i] == token:
+                    del self._sorted_tokens[i]
+
+    @staticmethod
+    def _drop(postings: Dict[str, Set[str]], key: str, donor_id: str):
+        members = postings.get(key)
+        if members is not None:
+            members.discard(donor_id)
+            if not members:
+                del postings[key]
+
+    def score(self, a: str, b: str) -> float:
+        """Match score between two indexed donors, from 0 to 1"""
+        with self._lock:
+            return self._score(a, b)
+
+    def _score(self, a, b):
+        _, _, grams_a, contact_a, _ = self.donors[a]
+        _, _, grams_b, contact_b, _ = self.donors[b]
+        return match_score(grams_a, contact_a, grams_b, contact_b)
+
+    def matches(self, name: Optional[str], contact_info: Optional[str] = None,
+                threshold: Optional[float] = None) -> List[Tuple[float, str, str]]:
+        """Indexed donors that look like the given one, best first, as
+        (score, donor_id, name)"""
+        threshold = self.threshold if threshold is None else threshold
+        tokens = normalize_name(name)
+        contact = normalize_contact(contact_info)
+        grams = name_grams(tokens)
+        found = []
+        with self._lock:
+            candidates = set()
+            for key in blocking_keys(tokens, contact):
+                candidates |= self.blocks.get(key, set())
+
+            for donor_id in candidates:
+                other_name, _, other_grams, other_contact, _ = self.donors[donor_id]
+                score = match_score(grams, contact, other_grams, other_contact)
+                if score >= threshold:
+                    found.append((score, donor_id, other_name))
+        return sorted(found, reverse=True)
+
+    def duplicates(self, threshold: Optional[float] = None) -> List[Tuple[float, str, str]]:
+        """Likely duplicate pairs as (score, donor_id, donor_id), best first"""
+        threshold = self.threshold if threshold is None else threshold
+        # A pair sharing several blocks is rescored rather than remembered:
+        # scoring is cheaper than keeping every candidate pair in a set
+        pairs = {}
+        with self._lock:
+            for members in self.blocks.values():
+                if len(members) < 2 or len(members) > self.max_block_size:
+                    continue
+                for a, b in combinations(sorted(members), 2):
+                    if (a, b) not in pairs:
+                        score = self._score(a, b)
+                        if score >= threshold:
+                            pairs[a, b] = score
+        return sorted(((score, a, b) for (a, b), score in pairs.items()), reverse=True)
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Slice of the sorted token list starting with `prefix`"""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.tokens)
+        return (bisect.bisect_left(self._sorted_tokens, prefix),
+                bisect.bisect_left(self._sorted_tokens, prefix + '\uffff'))
+
+    def _prefix_size(self, prefix: str) -> int:
+        """Number of donors behind a prefix"""
+        start, end = self._prefix_range(prefix)
+        return sum(len(self.tokens[token]) for token in self._sorted_tokens[start:end])
+
+    def _with_prefix(self, prefix: str) -> Iterator[str]:
+        """Donors with a name token starting with `prefix`, in token order"""
+        start, end = self._prefix_range(prefix)
+        for token in islice(self._sorted_tokens, start, end):
+            yield from self.tokens[token]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str, str, float]]:
+        """Search-as-you-type over names and contacts; returns
+        (donor_id, name, contact_info, score) for the best matches.
+
+        Donors whose name tokens start with every query token come first
+        (score 1.0); remaining slots are filled by trigram overlap, which
+        tolerates typos."""
+        with self._lock:
+            return self._search(query, limit)
+
+    def _search(self, query, limit):
+        contact = normalize_contact(query)
+        found = set(self.blocks.get('c:' + contact, ())) if contact else set()
+
+        tokens = normalize_name(query)
+        if tokens:
+            # Prefixes covering few tokens are intersected as sets; the rest
+            # are checked against each candidate's own tokens until enough match
+            narrow, wide = [], []
+            for token in tokens:
+                start, end = self._prefix_range(token)
+                if end - start <= self.max_prefix_tokens:
+                    narrow.append(set().union(*(self.tokens[own]
+                                                for own in self._sorted_tokens[start:end])))
+                else:
+                    wide.append(token)
+            if narrow:
+                candidates = iter(set.intersection(*sorted(narrow, key=len)))
+            else:
+                candidates = self._with_prefix(min(wide, key=lambda token: self._prefix_size(token)))
+            for donor_id in candidates:
+                if len(found) >= limit:
+                    break
+                if all(any(own.startswith(token) for own in self.donors[donor_id][4])
+                       for token in wide):
+                    found.add(donor_id)
+        results = [(donor_id, 1.0)
+                   for donor_id in sorted(found, key=lambda donor_id: self.donors[donor_id][0])[:limit]]
+
+        grams = name_grams(tokens, prefix_last=True)
+        if len(results) < limit and grams:
+            # The rarest trigrams propose candidates. A typo changes at most
+            # three trigrams, so the donor meant shares all but three of them
+            rare = sorted((gram for gram in grams if gram in self.grams),
+                          key=lambda gram: len(self.grams[gram]))[:8]
+            hits = Counter()
+            for gram in rare:
+                hits.update(self.grams[gram])
+            need = max(len(rare) - 3, 1)
+            hits = [donor_id for donor_id, count in hits.items()
+                    if count >= need and donor_id not in found]
+            scored = heapq.nlargest(limit - len(results), hits,
+                                    key=lambda donor_id: len(grams & self.donors[donor_id][2]))
+            results += [(donor_id, len(grams & self.donors[donor_id][2]) / len(grams))
+                        for donor_id in scored]
+
+        return [(donor_id, self.donors[donor_id][0], self.donors[donor_id][1], score)
+                for donor_id, score in results]
+
+
+def clusters(pairs: Iterable[Tuple[float, str, str]]) -> List[Set[str]]:
+    """Group matched pairs into connected sets of donors"""
+    parent: Dict[str, str] = {}
+
+    def find(donor_id):
+        parent.setdefault(donor_id, donor_id)
+        while parent[donor_id] != donor_id:
+            parent[donor_id] = parent[parent[donor_id]]
+            donor_id = parent[donor_id]
+        return donor_id
+
+    for _, a, b in pairs:
+        parent[find(a)] = find(b)
+
+    groups: Dict[str, Set[str]] = defaultdict(set)
+    for donor_id in list(parent):
+        groups[find(donor_id)].add(donor_id)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def create_tables(cursor):
+    """Alias table so IDs of merged donors keep resolving"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS donor_merges (
+        merged_id TEXT PRIMARY KEY,
+        donor_id TEXT NOT NULL,
+        merged_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(donor_id) REFERENCES donors(donor_id)
+    ) WITHOUT ROWID''')
+
+
+def resolve_donor(cursor, donor_id: str) -> Optional[str]:
+    """Current ID for a donor, following merges; None if unknown"""
+    cursor.execute('''
+        SELECT donor_id FROM donors WHERE donor_id = ?
+        UNION ALL
+        SELECT donor_id FROM donor_merges WHERE merged_id = ?
+    ''', (donor_id, donor_id))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def merge_donors(cursor, keep_id: str, merge_ids: List[str]) -> Optional[Tuple[List[str], str]]:
+    """Write operation: fold donors into `keep_id`, moving their donations
+    and remembering the old IDs; returns (merged IDs, kept contact info)"""
+    cursor.execute('SELECT contact_info FROM donors WHERE donor_id = ?', (keep_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    contact_info = row[0]
+
+    merged = []
+    for donor_id in merge_ids:
+        if donor_id == keep_id:
+            continue
+        cursor.execute('SELECT contact_info FROM donors WHERE donor_id = ?', (donor_id,))
+        other = cursor.fetchone()
+        if not other:
+            continue
+        if not contact_info and other[0]:
+            contact_info = other[0]
+
+        cursor.execute('UPDATE donations SET donor_id = ? WHERE donor_id = ?', (keep_id, donor_id))
+        cursor.execute('UPDATE donor_merges SET donor_id = ? WHERE donor_id = ?', (keep_id, donor_id))
+        cursor.execute('INSERT OR REPLACE INTO donor_merges (merged_id, donor_id) VALUES (?, ?)',
+                       (donor_id, keep_id))
+        cursor.execute('DELETE FROM donors WHERE donor_id = ?', (donor_id,))
+        merged.append(donor_id)
+
+    cursor.execute('UPDATE donors SET contact_info = ? WHERE donor_id = ?', (contact_info, keep_id))
+    return merged, contact_info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and merge duplicate donors")
+    parser.add_argument('db', help="path to the WelcomeHome database")
+    parser.add_argument('--threshold', type=float, default=0.75,
+                        help="minimum match score (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('duplicates', help="list likely duplicate pairs")
+    merge = subparsers.add_parser('merge', help="merge each cluster of duplicates into "
+                                                "the donor with the most donations")
+    merge.add_argument('--apply', action='store_true',
+                       help="write the merges (default is a dry run)")
+    search = subparsers.add_parser('search', help="search donors by name or contact")
+    search.add_argument('query')
+    args = parser.parse_args(argv)
+
+    index = DonorIndex(threshold=args.threshold)
+    index.rebuild(args.db)
+
+    if args.command == 'search':
+        for donor_id, name, contact_info, score in index.search(args.query):
+            print(f"{score:.2f}  {donor_id}  {name}  {contact_info}")
+        return
+
+    pairs = index.duplicates()
+    if args.command == 'duplicates':
+        for score, a, b in pairs:
+            print(f"{score:.2f}  {a} {index.donors[a][0]!r}  {b} {index.donors[b][0]!r}")
+        print(f"{len(pairs)} likely duplicate pair(s).")
+        return
+
+    with sqlite3.connect(args.db) as conn:
+        cursor = conn.cursor()
+        create_tables(cursor)
+        cursor.execute('SELECT donor_id, COUNT(*) FROM donations GROUP BY donor_id')
+        donation_counts = dict(cursor.fetchall())
+
+        merged = 0
+        for group in clusters(pairs):
+            keep_id = max(sorted(group), key=lambda donor_id: donation_counts.get(donor_id, 0))
+            others = sorted(group - {keep_id})
+            print(f"{keep_id} {index.donors[keep_id][0]!r} <- "
+                  + ', '.join(f"{donor_id} {index.donors[donor_id][0]!r}" for donor_id in others))
+            if args.apply:
+                merge_donors(cursor, keep_id, others)
+            merged += len(others)
+        conn.commit()
+
+    action = "Merged" if args.apply else "Would merge"
+    print(f"{action} {merged} donor(s).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .categories import CategoryTree
+
+STOPWORDS = {'a', 'an', 'and', 'any', 'for', 'in', 'of', 'or', 'some', 'the', 'to', 'with'}
+
+
+def keywords(*texts: Optional[str]) -> FrozenSet[str]:
+    """Lower-case words of the given texts, without stopwords and with a
+    trailing plural 's' removed, so 'Chairs' matches 'chair'"""
+    words = set()
+    for text in texts:
+        for word in re.findall(r'[a-z0-9]+', (text or '').lower()):
+            if word in STOPWORDS:
+                continue
+            if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+                word = word[:-1]
+            words.add(word)
+    return frozenset(words)
+
+
+def create_tables(cursor):
+    """Client needs and the matches found for them"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS client_needs (
+        need_pk INTEGER PRIMARY KEY,
+        need_id TEXT NOT NULL UNIQUE,
+        client_username TEXT NOT NULL,
+        category_id INTEGER,
+        description TEXT,
+        keywords TEXT NOT NULL DEFAULT '',
+        status TEXT NOT NULL DEFAULT 'open',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(client_username) REFERENCES users(username),
+        FOREIGN KEY(category_id) REFERENCES categories(category_id)
+    )''')
+
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_client_needs_client
+    ON client_needs(client_username, status)
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS need_matches (
+        need_pk INTEGER NOT NULL,
+        item_pk INTEGER NOT NULL,
+        matched_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        seen INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY(need_pk, item_pk),
+        FOREIGN KEY(need_pk) REFERENCES client_needs(need_pk),
+        FOREIGN KEY(item_pk) REFERENCES items(item_pk)
+    ) WITHOUT ROWID''')
+
+
+class NeedMatcher:
+    def __init__(self, categories: CategoryTree):
+        """Matches open client needs against available items.
+
+        Two inverted indexes are kept: available items by keyword and by
+        category, for suggesting items when a need is added or an order
+        starts; and open needs, each filed under its rarest keyword (or
+        its category when it has none), for finding the needs a newly
+        donated item satisfies. A need matches an item when every one of
+        its keywords appears in the item's name or description and the
+        item sits in the need's category subtree."""
+        self.categories = categories
+        self.items: Dict[str, Tuple[Optional[int], FrozenSet[str]]] = {}
+        self.items_by_keyword: Dict[str, Set[str]] = defaultdict(set)
+        self.items_by_category: Dict[Optional[int], Set[str]] = defaultdict(set)
+        self.needs: Dict[int, Tuple[str, Optional[int], FrozenSet[str], Optional[str]]] = {}
+        self.needs_by_keyword: Dict[str, Set[int]] = defaultdict(set)
+        self.needs_by_category: Dict[Optional[int], Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def rebuild(self, db_path: str):
+        """Load available items and open needs from the database"""
+        with sqlite3.connect(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT item_id, category_id, name, description
+                FROM items WHERE status = 'available'
+            ''')
+            items = cursor.fetchall()
+            cursor.execute('''
+                SELECT need_pk, client_username, category_id, keywords
+                FROM client_needs WHERE status = 'open'
+            ''')
+            needs = cursor.fetchall()
+
+        with self._lock:
+            self.items.clear()
+            self.items_by_keyword.clear()
+            self.items_by_category.clear()
+            self.needs.clear()
+            self.needs_by_keyword.clear()
+            self.needs_by_category.clear()
+            for item_id, category_id, name, description in items:
+                self._add_item(item_id, category_id, keywords(name, description))
+            for need_pk, client_username, category_id, words in needs:
+                self._add_need(need_pk, client_username, category_id, frozenset(words.split()))
+
+    def add_item(self, item_id: str, category_id: Optional[int],
+                 name: Optional[str], description: Optional[str]):
+        """Record a newly available item"""
+        with self._lock:
+            self._add_item(item_id, category_id, keywords(name, description))
+
+    def _add_item(self, item_id, category_id, words):
+        self._discard_item(item_id)
+        self.items[item_id] = (category_id, words)
+        self.items_by_category[category_id].add(item_id)
+        for word in words:
+            self.items_by_keyword[word].add(item_id)
+
+    def discard_items(self, *item_ids: str):
+        """Forget items that are no longer available"""
+        with self._lock:
+            for item_id in item_ids:
+                self._discard_item(item_id)
+
+    def _discard_item(self, item_id):
+        entry = self.items.pop(item_id, None)
+        if entry is None:
+            return
+        category_id, words = entry
+        self._drop(self.items_by_category, category_id, item_id)
+        for word in words:
+            self._drop(self.items_by_keyword, word, item_id)
+
+    def add_need(self, need_pk: int, client_username: str,
+                 category_id: Optional[int], words: FrozenSet[str]):
+        """Record an open need"""
+        with self._lock:
+            self._add_need(need_pk, client_username, category_id, words)
+
+    def _add_need(self, need_pk, client_username, category_id, words):
+        self._discard_need(need_pk)
+        # Every keyword must match, so filing the need under its rarest
+        # one is enough and keeps the lists probed per new item short
+        key = min(words, key=lambda word: (len(self.items_by_keyword.get(word, ())), word),
+                  default=None)
+        self.needs[need_pk] = (client_username, category_id, words, key)
+        if key is None:
+            self.needs_by_category[category_id].add(need_pk)
+        else:
+            self.needs_by_keyword[key].add(need_pk)
+
+    def discard_need(self, need_pk: int):
+        """Forget a need that was fulfilled or cancelled"""
+        with self._lock:
+            self._discard_need(need_pk)
+
+    def _discard_need(self, need_pk):
+        entry = self.needs.pop(need_pk, None)
+        if entry is None:
+            return
+        _, category_id, _, key = entry
+        if key is None:
+            self._drop(self.needs_by_category, category_id, need_pk)
+        else:
+            self._drop(self.needs_by_keyword, key, need_pk)
+
+    @staticmethod
+    def _drop(postings, key, value):
+        members = postings.get(key)
+        if members is not None:
+            members.discard(value)
+            if not members:
+                del postings[key]
+
+    def _in_category(self, item_category: Optional[int], need_category: Optional[int]) -> bool:
+        if need_category is None:
+            return True
+        return item_category is not None and need_category in self.categories.ancestor_ids(item_category)
+
+    def needs_for_items(self, item_ids: Iterable[str]) -> Dict[int, List[str]]:
+        """Open needs satisfied by the given available items, as
+        need_pk -> item IDs; only the index entries those items touch
+        are read, never the rest of the inventory"""
+        matches: Dict[int, List[str]] = defaultdict(list)
+        with self._lock:
+            for item_id in item_ids:
+                entry = self.items.get(item_id)
+                if entry is None:
+                    continue
+                category_id, words = entry
+
+                candidates = set()
+                for word in words:
+                    candidates |= self.needs_by_keyword.get(word, set())
+                if category_id is not None:
+                    for ancestor_id in self.categories.ancestor_ids(category_id):
+                        candidates |= self.needs_by_category.get(ancestor_id, set())
+
+                for need_pk in candidates:
+                    _, need_category, need_words, _ = self.needs[need_pk]
+                    if need_words <= words and self._in_category(category_id, need_category):
+                        matches[need_pk].append(item_id)
+        return dict(matches)
+
+    def items_for_need(self, category_id: Optional[int], words: FrozenSet[str],
+                       limit: Optional[int] = None) -> List[str]:
+        """Available items satisfying a need"""
+        with self._lock:
+            if words:
+                # Intersect keyword postings starting from the rarest
+                postings = sorted((self.items_by_keyword.get(word, set()) for word in words), key=len)
+                candidates = (item_id for item_id in postings[0]
+                              if all(item_id in others for others in postings[1:]))
+            elif category_id is not None:
+                candidates = (item_id for subcategory_id in self.categories.subtree_ids(category_id)
+                              for item_id in self.items_by_category.get(subcategory_id, ()))
+            else:
+                candidates = iter(self.items)
+
+            found = []
+            for item_id in candidates:
+                if limit is not None and len(found) >= limit:
+                    break
+                if not words or self._in_category(self.items[item_id][0], category_id):
+                    found.append(item_id)
+            return found
@@ -0,0 +1,112 @@
+import argparse
+import hashlib
+import hmac
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+# Hashes are stored as  $<algorithm>$<param>=<value>,...$<salt hex>$<hash hex>
+# Rows written before this format have a bare hex digest in `password`
+# and are verified with LEGACY_PARAMS.
+PBKDF2 = 'pbkdf2-sha256'
+SCRYPT = 'scrypt'
+
+DEFAULT_PARAMS = {
+    PBKDF2: {'i': 100000},
+    SCRYPT: {'n': 2 ** 14, 'r': 8, 'p': 1},
+}
+LEGACY_PARAMS = {'i': 100000}
+
+
+def _derive(algorithm: str, password: str, salt: bytes, params: Dict[str, int]) -> bytes:
+    """Run the key derivation function for one algorithm"""
+    if algorithm == PBKDF2:
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, params['i'])
+    if algorithm == SCRYPT:
+        n, r, p = params['n'], params['r'], params['p']
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r * p + 1024 * 1024, dklen=32)
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def _format_params(params: Dict[str, int]) -> str:
+    return ','.join(f"{key}={value}" for key, value in sorted(params.items()))
+
+
+def _parse_params(text: str) -> Dict[str, int]:
+    return {key: int(value) for key, value in (pair.split('=') for pair in text.split(','))}
+
+
+class PasswordHasher:
+    def __init__(self, algorithm: str = PBKDF2, params: Optional[Dict[str, int]] = None):
+        """Hash new passwords with `algorithm` at the given cost"""
+        if algorithm not in DEFAULT_PARAMS:
+            raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.params = dict(params or DEFAULT_PARAMS[algorithm])
+
+    def hash(self, password: str) -> Tuple[str, str]:
+        """Return (encoded hash, salt) for a new password"""
+        salt = os.urandom(16).hex()
+        digest = _derive(self.algorithm, password, bytes.fromhex(salt), self.params)
+        encoded = f"${self.algorithm}${_format_params(self.params)}${salt}${digest.hex()}"
+        return encoded, salt
+
+    def verify(self, password: str, stored: str, salt: str) -> bool:
+        """Check a password against a stored hash in constant time"""
+        if stored.startswith('$'):
+            _, algorithm, params, salt, expected = stored.split('$')
+            digest = _derive(algorithm, password, bytes.fromhex(salt), _parse_params(params))
+        else:
+            # Legacy rows: hex digest with the salt hex string used as raw bytes
+            expected = stored
+            digest = _derive(PBKDF2, password, salt.encode('utf-8'), LEGACY_PARAMS)
+        return hmac.compare_digest(digest.hex(), expected)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """Whether a stored hash uses a different algorithm or cost"""
+        if not stored.startswith('$'):
+            return True
+        _, algorithm, params, _, _ = stored.split('$')
+        return algorithm != self.algorithm or _parse_params(params) != self.params
+
+
+def _time_hash(algorithm: str, params: Dict[str, int]) -> float:
+    start = time.perf_counter()
+    _derive(algorithm, 'calibration', os.urandom(16), params)
+    return time.perf_counter() - start
+
+
+def calibrate(algorithm: str = PBKDF2, target_ms: float = 250.0) -> Dict[str, int]:
+    """Pick the cost parameters that hash in roughly `target_ms` on this machine"""
+    target = target_ms / 1000.0
+    if algorithm == PBKDF2:
+        # PBKDF2 cost is linear in iterations; extrapolate from a sample run
+        sample = 20000
+        elapsed = min(_time_hash(PBKDF2, {'i': sample}) for _ in range(3))
+        return {'i': max(10000, int(sample * target / elapsed) // 1000 * 1000)}
+    if algorithm == SCRYPT:
+        # scrypt cost is doubled through N, keeping r and p at their defaults
+        params = dict(DEFAULT_PARAMS[SCRYPT], n=2 ** 10)
+        while _time_hash(SCRYPT, dict(params, n=params['n'] * 2)) <= target:
+            params['n'] *= 2
+        return params
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate password hashing cost")
+    parser.add_argument('--algorithm', choices=sorted(DEFAULT_PARAMS), default=PBKDF2)
+    parser.add_argument('--target-ms', type=float, default=250.0,
+                        help="desired login hashing latency in milliseconds")
+    args = parser.parse_args()
+
+    params = calibrate(args.algorithm, args.target_ms)
+    elapsed = _time_hash(args.algorithm, params) * 1000
+    print(f"algorithm: {args.algorithm}")
+    print(f"params:    {params}  ({elapsed:.0f} ms on this machine)")
+    print(f"use:       WelcomeHomeApp(password_hasher=PasswordHasher({args.algorithm!r}, {params}))")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import sqlite3
+import functools
+import threading
+from typing import Dict, FrozenSet, Iterable, List
+
+# Role used for calls made before anyone has logged in
+ANONYMOUS_ROLE = 'anonymous'
+# Role anyone may give themselves when registering; other roles need
+# assign_roles
+SELF_SERVICE_ROLE = 'client'
+
+# Policy seeded into a fresh database; mirrors what each role could do
+# before permissions were stored in the database. Permissions added here
+# later are granted to these roles the first time a database sees them.
+STAFF_PERMISSIONS = ['login', 'register_user', 'assign_roles', 'find_item_locations', 'find_order_items',
+                     'accept_donation', 'start_order', 'add_to_order', 'prepare_order',
+                     'get_user_orders', 'manage_permissions',
+                     'browse_available', 'check_availability',
+                     'manage_categories', 'search_categories', 'run_reports',
+                     'list_records', 'dispatch_deliveries', 'complete_deliveries',
+                     'manage_attachments', 'view_attachments',
+                     'register_donor', 'search_donors', 'manage_donors',
+                     'manage_needs']
+
+DEFAULT_POLICY = {
+    ANONYMOUS_ROLE: ['login', 'register_user'],
+    'client': ['login', 'register_user', 'find_item_locations', 'get_user_orders',
+               'search_categories', 'manage_needs'],
+    'volunteer': ['login', 'register_user', 'find_item_locations',
+                  'find_order_items', 'get_user_orders', 'browse_available',
+                  'search_categories', 'list_records', 'complete_deliveries',
+                  'view_attachments', 'register_donor', 'search_donors',
+                  'manage_needs'],
+    'staff': STAFF_PERMISSIONS,
+    'admin': STAFF_PERMISSIONS,
+}
+
+
+class PermissionEngine:
+    def __init__(self, db_path='welcomehome.db'):
+        """Set up permission tables and an empty compiled-policy cache"""
+        self.db_path = db_path
+        self._compiled: Dict[str, FrozenSet[str]] = {}
+        # Bumped by every invalidate, so a compile that raced one is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._create_tables()
+
+    def _create_tables(self):
+        """Create roles/permissions tables and seed the default policy"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS roles (
+                role TEXT PRIMARY KEY
+            )''')
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS permissions (
+                permission TEXT PRIMARY KEY
+            )''')
+
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS role_permissions (
+                role TEXT NOT NULL,
+                permission TEXT NOT NULL,
+                PRIMARY KEY(role, permission),
+                FOREIGN KEY(role) REFERENCES roles(role),
+                FOREIGN KEY(permission) REFERENCES permissions(permission)
+            ) WITHOUT ROWID''')
+
+            # Only seed permissions the database has never seen, so grants
+            # and revocations made since are never overwritten
+            cursor.execute('SELECT permission FROM permissions')
+            known = {row[0] for row in cursor.fetchall()}
+            for role, permissions in DEFAULT_POLICY.items():
+                self._grant(cursor, role, [p for p in permissions if p not in known])
+
+            conn.commit()
+
+    def _grant(self, cursor, role: str, permissions: Iterable[str]):
+        """Insert role/permission pairs, creating either side as needed"""
+        cursor.execute('INSERT OR IGNORE INTO roles (role) VALUES (?)', (role,))
+        for permission in permissions:
+            cursor.execute('INSERT OR IGNORE INTO permissions (permission) VALUES (?)',
+                           (permission,))
+            cursor.execute('''
+                INSERT OR IGNORE INTO role_permissions (role, permission)
+                VALUES (?, ?)
+            ''', (role, permission))
+
+    def _compile(self, role: str) -> FrozenSet[str]:
+        """Load a role's permissions from the database into a frozenset"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT permission FROM role_permissions WHERE role = ?', (role,))
+            return frozenset(row[0] for row in cursor.fetchall())
+
+    def roles(self) -> List[str]:
+        """Every role known to the policy, including the anonymous one"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT role FROM roles ORDER BY role')
+            return [row[0] for row in cursor.fetchall()]
+
+    def permissions_for(self, role: str) -> FrozenSet[str]:
+        """Return the compiled permission set for a role"""
+        compiled = self._compiled.get(role)
+        if compiled is None:
+            generation = self._generation
+            compiled = self._compile(role)
+            with self._lock:
+                if self._generation == generation:
+                    self._compiled[role] = compiled
+        return compiled
+
+    def is_allowed(self, role: str, permission: str) -> bool:
+        """Check a permission; a set lookup once the role is compiled"""
+        return permission in self.permissions_for(role)
+
+    def grant(self, role: str, *permissions: str):
+        """Grant permissions to a role"""
+        with sqlite3.connect(self.db_path) as conn:
+            self._grant(conn.cursor(), role, permissions)
+            conn.commit()
+        self.invalidate(role)
+
+    def revoke(self, role: str, *permissions: str):
+        """Revoke permissions from a role"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany('''
+                DELETE FROM role_permissions
+                WHERE role = ? AND permission = ?
+            ''', [(role, permission) for permission in permissions])
+            conn.commit()
+        self.invalidate(role)
+
+    def invalidate(self, role: str = None):
+        """Drop cached permission sets, for one role or all of them.
+
+        Call with no arguments after editing the policy tables directly."""
+        with self._lock:
+            self._generation += 1
+            if role is None:
+                self._compiled.clear()
+            else:
+                self._compiled.pop(role, None)
+
+
+def requires_permission(permission: str, default=None):
+    """Decorate a WelcomeHomeApp method so it only runs when the current
+    user's role holds `permission`; otherwise return `default`."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            role = self.current_user['role'] if self.current_user else ANONYMOUS_ROLE
+            if not self.permissions.is_allowed(role, permission):
+                print(f"Permission denied: {permission}.")
+                return default() if callable(default) else default
+            return method(self, *args, **kwargs)
+        wrapper.permission = permission
+        return wrapper
+    return decorator
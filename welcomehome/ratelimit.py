@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+
+class TokenBucket:
+    __slots__ = ('capacity', 'refill_rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: float, refill_rate: float, now: float):
+        """Bucket holding up to `capacity` tokens, refilled at `refill_rate`/s"""
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def try_consume(self, now: float) -> bool:
+        """Take one token if available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class LoginRateLimiter:
+    def __init__(self, db_path='welcomehome.db',
+                 user_capacity: float = 5, user_refill_rate: float = 0.1,
+                 client_capacity: float = 20, client_refill_rate: float = 1.0,
+                 flush_interval: float = 30.0):
+        """In-memory token buckets for login attempts, keyed by username and
+        by client. Attempt counts are flushed to `login_attempts` at most
+        every `flush_interval` seconds instead of on every attempt."""
+        self.db_path = db_path
+        self.limits = {
+            'user': (user_capacity, user_refill_rate),
+            'client': (client_capacity, client_refill_rate),
+        }
+        self.flush_interval = flush_interval
+        self.counters = Counter()
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._pending: Dict[Tuple[str, str], Counter] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._create_tables()
+
+    def _create_tables(self):
+        """Create the login attempts table"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS login_attempts (
+                key_type TEXT NOT NULL,
+                key TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                blocked INTEGER NOT NULL DEFAULT 0,
+                last_attempt DATETIME,
+                PRIMARY KEY(key_type, key)
+            ) WITHOUT ROWID''')
+            conn.commit()
+
+    def _record(self, keys, outcome: str):
+        """Count an outcome in memory, for stats and for the next flush"""
+        for key in keys:
+            self._pending.setdefault(key, Counter())[outcome] += 1
+        self.counters[outcome] += 1
+
+    def allow(self, username: str, client: str) -> bool:
+        """Consume a token from both the username and client buckets.
+
+        Returns False, without touching the database, when either is empty."""
+        now = time.monotonic()
+        keys = (('user', username), ('client', client))
+        with self._lock:
+            for key in keys:
+                if key not in self._buckets:
+                    self._buckets[key] = TokenBucket(*self.limits[key[0]], now)
+            # Both buckets are charged even when one is already empty
+            allowed = all([self._buckets[key].try_consume(now) for key in keys])
+            self._record(keys, 'attempts')
+            if not allowed:
+                self._record(keys, 'blocked')
+        self._maybe_flush(now)
+        return allowed
+
+    def record_failure(self, username: str, client: str):
+        """Count a login that was checked and rejected"""
+        with self._lock:
+            self._record((('user', username), ('client', client)), 'failures')
+
+    def record_success(self, username: str, client: str):
+        """Count a successful login and refill that username's bucket"""
+        with self._lock:
+            self.counters['successes'] += 1
+            self._buckets.pop(('user', username), None)
+
+    def _maybe_flush(self, now: float):
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write pending attempt counts to the database and drop buckets
+        that have refilled, so memory stays bounded by recent traffic"""
+        now = time.monotonic()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = now
+            for key in [key for key, bucket in self._buckets.items() if bucket.is_full(now)]:
+                del self._buckets[key]
+        if not pending:
+            return
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany('''
+                INSERT INTO login_attempts (key_type, key, attempts, failures, blocked, last_attempt)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(key_type, key) DO UPDATE SET
+                    attempts = attempts + excluded.attempts,
+                    failures = failures + excluded.failures,
+                    blocked = blocked + excluded.blocked,
+                    last_attempt = excluded.last_attempt
+            ''', [(key_type, key, counts['attempts'], counts['failures'], counts['blocked'])
+                  for (key_type, key), counts in pending.items()])
+            conn.commit()
+
+    def stats(self) -> dict:
+        """Counters since startup plus the number of tracked buckets"""
+        with self._lock:
+            return dict(self.counters, tracked_keys=len(self._buckets))
@@ -0,0 +1,128 @@
+import keyword
+import operator
+import sqlite3
+from functools import lru_cache
+from typing import Iterator, Optional, Sequence, Tuple, Type
+
+
+class Record:
+    """Base for result rows: one __slots__ attribute per column.
+
+    Records behave like the tuples they replace (indexing, unpacking,
+    len, comparison with tuples) so positional callers keep working,
+    while new code can use the column names."""
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_row(cls, cursor: sqlite3.Cursor, row: tuple) -> 'Record':
+        """Usable directly as a sqlite3 row_factory"""
+        return cls(*row)
+
+    def _astuple(self) -> tuple:
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def _asdict(self) -> dict:
+        return {field: getattr(self, field) for field in self._fields}
+
+    def __iter__(self):
+        return iter(self._astuple())
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, index):
+        return self._astuple()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, tuple)):
+            return self._astuple() == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._astuple())
+
+    def __repr__(self):
+        values = ', '.join(f'{field}={getattr(self, field)!r}' for field in self._fields)
+        return f'{type(self).__name__}({values})'
+
+    def __reduce__(self):
+        return _restore, (type(self).__name__, self._fields, self._astuple())
+
+
+def _restore(name, fields, values):
+    return record_type(name, fields)(*values)
+
+
+@lru_cache(maxsize=256)
+def record_type(name: str, fields: Tuple[str, ...]) -> Type[Record]:
+    """Slotted Record subclass for the given columns (cached per shape)"""
+    fields = tuple(fields)
+    for field in fields:
+        if not field.isidentifier() or keyword.iskeyword(field) or field.startswith('_'):
+            raise ValueError(f"Invalid column name for a record: {field!r}")
+
+    # Generated like namedtuple's __new__: a plain positional __init__
+    # is much cheaper per row than a generic setattr loop
+    arguments = ', '.join(fields)
+    body = ''.join(f'\n    self.{field} = {field}' for field in fields) or '\n    pass'
+    namespace = {}
+    exec(f'def __init__(self, {arguments}):{body}', namespace)
+
+    cls = type(name, (Record,), {
+        '__slots__': fields,
+        '_fields': fields,
+        '__init__': namespace['__init__'],
+    })
+    if len(fields) > 1:
+        getter = operator.attrgetter(*fields)
+        cls._astuple = lambda self: getter(self)
+    return cls
+
+
+def record_factory(name: str = 'Row'):
+    """sqlite3 row_factory building records shaped like each query's
+    columns, so projected queries get matching record types"""
+    last = [None, None]
+
+    def factory(cursor, row):
+        description = cursor.description
+        if description is not last[0]:
+            last[0] = description
+            last[1] = record_type(name, tuple(column[0] for column in description))
+        return last[1](*row)
+
+    return factory
+
+
+def iter_records(cursor: sqlite3.Cursor, sql: str, params: Sequence = (),
+                 record: Optional[Type[Record]] = None, chunk_size: int = 1000) -> Iterator[Record]:
+    """Run a query and yield its rows as records, fetching `chunk_size`
+    rows at a time instead of materializing the whole result"""
+    cursor.row_factory = record.from_row if record is not None else record_factory()
+    cursor.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def projection(columns: Optional[Sequence[str]], available: Sequence[str],
+               key: Optional[str] = None) -> Tuple[str, ...]:
+    """Validate requested columns against a listing's columns; the
+    listing's key column, if any, always comes first"""
+    if columns is None:
+        return tuple(available)
+    unknown = [column for column in columns if column not in available]
+    if unknown:
+        raise ValueError(f"Unknown column(s) {', '.join(unknown)}; "
+                         f"choose from {', '.join(available)}")
+    selected = [column for column in columns if column != key]
+    return ((key,) if key else ()) + tuple(dict.fromkeys(selected))
+
+
+OrderRecord = record_type('OrderRecord', ('order_id', 'client_username', 'status', 'created_at'))
+ItemRecord = record_type('ItemRecord', ('item_id', 'name', 'category_id', 'location', 'status'))
+UserOrderRecord = record_type('UserOrderRecord', ('order_id', 'status', 'created_at'))
+OrderItemRecord = record_type('OrderItemRecord', ('item_id', 'location'))
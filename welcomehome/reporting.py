@@ -0,0 +1,122 @@
+import multiprocessing
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+# Report name -> (SQL with named parameters, parameter defaults)
+REPORTS = {
+    'order_history': ('''
+        SELECT o.order_id, o.client_username, o.status, o.created_at,
+               COUNT(oi.item_pk) AS item_count
+        FROM orders o
+        LEFT JOIN order_items oi ON oi.order_pk = o.order_pk
+        WHERE :client_username IS NULL OR o.client_username = :client_username
+        GROUP BY o.order_pk
+        ORDER BY o.created_at
+    ''', {'client_username': None}),
+    'donor_history': ('''
+        SELECT d.donor_id, d.name, dn.donation_id, dn.staff_username, dn.donation_date
+        FROM donors d
+        JOIN donations dn ON dn.donor_id = d.donor_id
+        WHERE :donor_id IS NULL OR d.donor_id = :donor_id
+        ORDER BY d.donor_id, dn.donation_date
+    ''', {'donor_id': None}),
+    'inventory_breakdown': ('''
+        SELECT c.name AS category, i.status, i.location, COUNT(*) AS item_count
+        FROM items i
+        LEFT JOIN categories c ON c.category_id = i.category_id
+        GROUP BY i.category_id, i.status, i.location
+        ORDER BY category, i.status, i.location
+    ''', {}),
+}
+
+# Read-only connection held by each worker process
+_worker_conn = None
+
+
+def _open_worker_connection(db_path: str):
+    """Pool initializer: open this worker's read-only connection"""
+    global _worker_conn
+    _worker_conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def _run_report(sql: str, params: dict, chunk_size: int, chunks):
+    """Worker side: run a query and stream rows back in chunks.
+
+    A None sentinel always follows the last chunk, even on error, so the
+    reader never waits forever; the error itself surfaces via the future."""
+    try:
+        cursor = _worker_conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunks.put(rows)
+        cursor.close()
+    finally:
+        chunks.put(None)
+
+
+class ReportingEngine:
+    def __init__(self, db_path='welcomehome.db', max_workers: Optional[int] = None,
+                 chunk_size: int = 1000, max_buffered_chunks: int = 8):
+        """Run heavy read-only reports in a process pool.
+
+        Each worker holds a read-only (mode=ro) connection, and the database
+        is switched to WAL so reports never block writers. At most
+        `max_workers` reports run at once; further requests wait."""
+        self.db_path = db_path
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+        self.max_buffered_chunks = max_buffered_chunks
+        self.closed = False
+
+        with sqlite3.connect(db_path) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+
+        # Spawned rather than forked: the parent may hold open connections
+        # and a writer thread that must not be copied into workers
+        context = multiprocessing.get_context('spawn')
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._manager = context.Manager()
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                         initializer=_open_worker_connection,
+                                         initargs=(db_path,))
+
+    def stream(self, report: str, chunk_size: Optional[int] = None, **params) -> Iterator[List[tuple]]:
+        """Yield a report's rows in chunks as the worker produces them"""
+        if report not in REPORTS:
+            raise ValueError(f"Unknown report: {report}")
+        sql, defaults = REPORTS[report]
+        params = dict(defaults, **params)
+
+        with self._slots:
+            # Bounded so a slow reader throttles the worker instead of
+            # buffering the whole result
+            chunks = self._manager.Queue(maxsize=self.max_buffered_chunks)
+            future = self._pool.submit(_run_report, sql, params,
+                                       chunk_size or self.chunk_size, chunks)
+            finished = False
+            try:
+                while True:
+                    rows = chunks.get()
+                    if rows is None:
+                        finished = True
+                        break
+                    yield rows
+            finally:
+                # Reader stopped early: drain so the worker can finish
+                while not finished:
+                    finished = chunks.get() is None
+            future.result()
+
+    def run(self, report: str, **params) -> List[tuple]:
+        """Run a report and return all of its rows"""
+        return [row for rows in self.stream(report, **params) for row in rows]
+
+    def close(self):
+        """Shut down worker processes"""
+        self.closed = True
+        self._pool.shutdown()
+        self._manager.shutdown()
@@ -0,0 +1,53 @@
+import os
+import threading
+import weakref
+from typing import Callable, Dict, Optional, Tuple
+
+# In-memory state mirroring a database (indexes, caches, worker pools),
+# shared by every session on that database file in this process, so one
+# session's changes are seen by all of them. Entries are held weakly:
+# state lives as long as some session uses it, and the next session
+# after that builds it afresh from the database.
+_state = weakref.WeakValueDictionary()
+_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_guard = threading.Lock()
+
+
+def database_key(db_path: str) -> str:
+    """Identify a database file however its path is spelled"""
+    return os.path.realpath(db_path)
+
+
+def shared_state(database: str, name: str, build: Optional[Callable[[], object]] = None):
+    """The `name` state of a database (see database_key), made with
+    build() the first time it is needed, once even when sessions race;
+    None if it does not exist and no build is given"""
+    key = (database, name)
+    with _guard:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        state = _state.get(key)
+        if state is None and build is not None:
+            state = build()
+            _state[key] = state
+        return state
+
+
+def forget_state(database: str, name: str, state: object):
+    """Stop sharing `state`, e.g. after it was closed; the next lookup builds anew"""
+    with _guard:
+        if _state.get((database, name)) is state:
+            del _state[(database, name)]
+
+
+def _reset_after_fork():
+    # A forked child's copy would stop following the database as soon
+    # as the parent writes, and its locks may have been held mid-update
+    global _guard
+    _state.clear()
+    _locks.clear()
+    _guard = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,282 @@
+import argparse
+import contextlib
+import functools
+import gzip
+import inspect
+import io
+import itertools
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Arguments never written to a workload log
+REDACTED_ARGS = {'login': {'password'}, 'register_user': {'password'}}
+REDACTED = '<redacted>'
+# Password every user has during replay; logins recorded as failed are
+# replayed with a wrong one
+REPLAY_PASSWORD = 'replay-password'
+
+# Version 2 records login outcomes and times streamed calls to the end
+LOG_VERSION = 2
+
+
+def public_methods(app) -> List[str]:
+    """Names of the permission-checked public methods of a WelcomeHomeApp"""
+    return [name for name, member in inspect.getmembers(type(app), inspect.isfunction)
+            if hasattr(member, 'permission')]
+
+
+class WorkloadRecorder:
+    def __init__(self, path: str):
+        """Append every public call of attached sessions to a gzip'd JSON
+        lines log: one header line, then one line per call."""
+        self.path = path
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._sessions = itertools.count(1)
+        self._start = time.perf_counter()
+        self._write({'version': LOG_VERSION, 'started': time.time()})
+
+    def _write(self, entry: dict):
+        line = json.dumps(entry, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def attach(self, app) -> int:
+        """Wrap an app's public methods so each call is recorded; returns
+        the session number used in the log"""
+        session = next(self._sessions)
+        for name in public_methods(app):
+            setattr(app, name, self._wrap(session, name, getattr(app, name)))
+        return session
+
+    def _wrap(self, session: int, name: str, method):
+        signature = inspect.signature(method)
+        redacted = REDACTED_ARGS.get(name, set())
+
+        @functools.wraps(method)
+        def recorded(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            arguments = {key: (REDACTED if key in redacted else value)
+                         for key, value in bound.arguments.items()}
+            offset = time.perf_counter() - self._start
+
+            def record(result, error):
+                self._write({
+                    's': session, 't': round(offset, 6), 'm': name, 'a': arguments,
+                    'd': round(time.perf_counter() - self._start - offset, 6),
+                    # String results (new order IDs) let replay remap later
+                    # calls; booleans (login) let it repeat the outcome
+                    'r': result if isinstance(result, (str, bool)) else None,
+                    'e': error,
+                })
+
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                record(None, type(e).__name__)
+                raise
+            if inspect.isgenerator(result):
+                # Streaming methods do their work as they are consumed
+                return self._recorded_stream(result, record)
+            record(result, None)
+            return result
+        return recorded
+
+    @staticmethod
+    def _recorded_stream(chunks, record):
+        """Pass a stream through, recording the call once it is finished
+        or abandoned, so its duration covers producing every chunk"""
+        error = None
+        try:
+            yield from chunks
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record(None, error)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_log(path: str):
+    """Return (header, calls) from a workload log"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('version') != LOG_VERSION:
+            raise ValueError(f"Unsupported workload log version: {header.get('version')}")
+        return header, [json.loads(line) for line in f]
+
+
+def _as_keywords(method, arguments: dict) -> dict:
+    """Turn recorded bound arguments back into keyword arguments, expanding
+    a recorded **kwargs parameter"""
+    keywords = {}
+    for name, parameter in inspect.signature(method).parameters.items():
+        if name not in arguments:
+            continue
+        if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+            keywords.update(arguments[name])
+        else:
+            keywords[name] = arguments[name]
+    return keywords
+
+
+def replay(log_path: str, db_path: str, speed: Optional[float] = 1.0,
+           concurrency: int = 4, output: Optional[str] = None, app_options: Optional[dict] = None):
+    """Re-run a workload log against a copy of `db_path`.
+
+    Each recorded session gets its own WelcomeHomeApp and keeps its call
+    order; sessions are spread over `concurrency` threads. `speed` scales
+    the recorded timing (1.0 real time, 10.0 ten times faster, None as fast
+    as possible). Passwords are never recorded, so in the copy every user
+    gets REPLAY_PASSWORD and logins that succeeded are replayed with it,
+    failed ones with a wrong password. Streamed results are read to the
+    end. Returns the replay's own workload log."""
+    from .app import WelcomeHomeApp
+    from .passwords import PasswordHasher
+
+    _, calls = read_log(log_path)
+    sessions: Dict[int, List[dict]] = defaultdict(list)
+    for call in calls:
+        sessions[call['s']].append(call)
+    # Streamed calls are logged when they finish, possibly after calls
+    # the session made later
+    for session_calls in sessions.values():
+        session_calls.sort(key=lambda call: call['t'])
+
+    workdir = tempfile.mkdtemp(prefix='welcomehome-replay-')
+    replay_db = os.path.join(workdir, 'replay.db')
+    shutil.copy(db_path, replay_db)
+    hasher = (app_options or {}).get('password_hasher') or PasswordHasher()
+    with contextlib.closing(WelcomeHomeApp(replay_db, **(app_options or {}))) as app:
+        with app._connect() as conn:
+            conn.execute('UPDATE users SET password = ?, salt = ?',
+                         hasher.hash(REPLAY_PASSWORD))
+    output = output or os.path.join(workdir, 'replay.log.gz')
+    recorder = WorkloadRecorder(output)
+
+    # Recorded return values (new order IDs) -> the values replay produced
+    id_map: Dict[str, str] = {}
+    id_lock = threading.Lock()
+    session_ids = sorted(sessions)
+    start = time.perf_counter()
+
+    def remap(value):
+        if isinstance(value, str):
+            with id_lock:
+                return id_map.get(value, value)
+        if isinstance(value, list):
+            return [remap(v) for v in value]
+        if isinstance(value, dict):
+            return {k: remap(v) for k, v in value.items()}
+        return value
+
+    def run_session(session_calls):
+        app = WelcomeHomeApp(replay_db, **(app_options or {}))
+        recorder.attach(app)
+        for call in session_calls:
+            if speed is not None:
+                delay = call['t'] / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            arguments = remap(call['a'])
+            if call['m'] == 'login':
+                arguments['password'] = REPLAY_PASSWORD if call['r'] is not False else REDACTED
+            if call['m'] == 'register_user':
+                arguments['password'] = REPLAY_PASSWORD
+            method = getattr(app, call['m'])
+            try:
+                result = method(**_as_keywords(method, arguments))
+                if inspect.isgenerator(result):
+                    for _ in result:
+                        pass
+            except Exception:
+                continue
+            if isinstance(call['r'], str) and isinstance(result, str):
+                with id_lock:
+                    id_map[call['r']] = result
+
+    def run_worker(worker):
+        for session in session_ids[worker::concurrency]:
+            run_session(sessions[session])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        threads = [threading.Thread(target=run_worker, args=(n,)) for n in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    recorder.close()
+    return output
+
+
+def latency_summary(calls: List[dict]) -> Dict[str, Dict[str, float]]:
+    """Per-method call count and latency percentiles in milliseconds"""
+    by_method = defaultdict(list)
+    for call in calls:
+        by_method[call['m']].append(call['d'] * 1000)
+
+    summary = {}
+    for method, durations in sorted(by_method.items()):
+        durations.sort()
+        pick = lambda q: durations[min(len(durations) - 1, int(q * len(durations)))]
+        summary[method] = {'count': len(durations), 'mean': statistics.fmean(durations),
+                           'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+    return summary
+
+
+def compare(baseline_path: str, candidate_path: str) -> str:
+    """Side-by-side latency distributions of two workload logs"""
+    baseline = latency_summary(read_log(baseline_path)[1])
+    candidate = latency_summary(read_log(candidate_path)[1])
+
+    lines = [f"{'method':<26}{'n':>7}{'p50 ms':>16}{'p95 ms':>16}{'p99 ms':>16}"]
+    for method in sorted(baseline.keys() | candidate.keys()):
+        a, b = baseline.get(method), candidate.get(method)
+        cells = []
+        for q in ('p50', 'p95', 'p99'):
+            left = f"{a[q]:.2f}" if a else '-'
+            right = f"{b[q]:.2f}" if b else '-'
+            cells.append(f"{left + ' > ' + right:>16}")
+        count = (b or a)['count']
+        lines.append(f"{method:<26}{count:>7}" + ''.join(cells))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay and compare WelcomeHome workload logs")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    replay_parser = commands.add_parser('replay', help="re-run a log against a copy of a database")
+    replay_parser.add_argument('log')
+    replay_parser.add_argument('db')
+    replay_parser.add_argument('--speed', default='1',
+                               help="time scale: 1 for real time, N for N times faster, 'max'")
+    replay_parser.add_argument('--concurrency', type=int, default=4)
+    replay_parser.add_argument('--output', help="where to write the replay's own log")
+
+    compare_parser = commands.add_parser('compare', help="compare latency between two logs")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+
+    args = parser.parse_args()
+    if args.command == 'replay':
+        speed = None if args.speed == 'max' else float(args.speed)
+        output = replay(args.log, args.db, speed, args.concurrency, args.output)
+        print(f"Replay log written to {output}")
+        print(compare(args.log, output))
+    else:
+        print(compare(args.baseline, args.candidate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+# Sentinel put on the queue to stop the writer thread
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, db_path='welcomehome.db', max_batch: int = 64,
+                 max_latency: float = 0.0, max_pending: int = 1024):
+        """Single writer thread that coalesces writes into group commits.
+
+        Operations are callables taking a cursor. Each batch of up to
+        `max_batch` operations runs in one transaction with one commit. A
+        batch takes whatever queued up during the previous commit, and
+        waits up to `max_latency` seconds for more (none by default).
+        Every operation runs inside its own savepoint, so one failing only
+        rolls back its own changes. `max_pending` bounds the queue so
+        callers block instead of piling up unbounded work."""
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name='welcomehome-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: Callable, *args) -> Future:
+        """Queue operation(cursor, *args); the future resolves after commit"""
+        future = Future()
+        self._queue.put((future, operation, args))
+        return future
+
+    def close(self):
+        """Finish queued writes and stop the writer thread"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first):
+        """Gather a batch starting with `first`; returns (batch, stop)"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.OperationalError:
+            # Another connection holds a lock; stay in the current journal
+            # mode rather than lose the writer
+            pass
+        cursor = conn.cursor()
+
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            self._commit_batch(conn, cursor, batch)
+        conn.close()
+
+    def _commit_batch(self, conn, cursor, batch):
+        results = []
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            for future, operation, args in batch:
+                cursor.execute('SAVEPOINT operation')
+                try:
+                    results.append((future, operation(cursor, *args), None))
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO operation')
+                    results.append((future, None, e))
+                cursor.execute('RELEASE operation')
+            cursor.execute('COMMIT')
+        except Exception as e:
+            # Never let an error kill the writer thread: fail this batch only
+            if conn.in_transaction:
+                conn.rollback()
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """Batches committed so far and their average size"""
+        return {
+            'batches': self.batches,
+            'operations': self.operations,
+            'average_batch': self.operations / self.batches if self.batches else 0.0,
+        }